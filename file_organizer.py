@@ -7,14 +7,13 @@
 """
 
 import os
-import shutil
 import argparse
-import glob
-import re
 from pathlib import Path
 import pandas as pd
 
-def organize_csv_files(source_dir=".", target_dir="organized_data", dry_run=False):
+from src.utils.fs_ops import classify_csv, scan_files, open_dir, transfer
+
+def organize_csv_files(source_dir=".", target_dir="organized_data", dry_run=False, move=False):
     """
     整理CSV文件，將它們分類並移動到指定的目錄結構中
     
@@ -22,45 +21,49 @@ def organize_csv_files(source_dir=".", target_dir="organized_data", dry_run=Fals
         source_dir: 源目錄，包含要整理的CSV文件
         target_dir: 目標目錄，用於存放整理後的文件
         dry_run: 如果為True，只顯示將執行的操作而不實際移動文件
+        move: 如果為True，移動文件而不是複製
+        
+    返回值:
+        moved: 字典 {源文件路徑: 目標文件路徑}，僅包含實際傳輸的文件
     """
-    # 創建目標目錄結構
+    # 創建目標目錄結構，並將每個目標子目錄只打開一次
+    dir_fds = {}
     if not dry_run:
-        os.makedirs(os.path.join(target_dir, "standard_evaluation"), exist_ok=True)
-        os.makedirs(os.path.join(target_dir, "method_comparison"), exist_ok=True)
-        os.makedirs(os.path.join(target_dir, "analysis_results"), exist_ok=True)
-        os.makedirs(os.path.join(target_dir, "raw_data"), exist_ok=True)
+        for subdir in ("standard_evaluation", "method_comparison", "analysis_results", "raw_data"):
+            subdir_path = os.path.join(target_dir, subdir)
+            os.makedirs(subdir_path, exist_ok=True)
+            dir_fds[subdir] = open_dir(subdir_path)
     
     # 查找所有CSV文件
-    csv_files = glob.glob(os.path.join(source_dir, "*.csv"))
+    csv_files = [path for _, path, ext in scan_files(source_dir) if ext == ".csv"]
     print(f"找到 {len(csv_files)} 個CSV文件")
     
     # 分類和移動文件
-    for file_path in csv_files:
-        file_name = os.path.basename(file_path)
-        
-        # 確定目標子目錄
-        if "standard" in file_name.lower() and "noise_reduction" in file_name.lower():
-            # 標準評估結果
-            target_subdir = "standard_evaluation"
-        elif "comparison" in file_name.lower() or "compare" in file_name.lower():
-            # 方法比較結果
-            target_subdir = "method_comparison"
-        elif "analysis" in file_name.lower():
-            # 分析結果
-            target_subdir = "analysis_results"
-        else:
-            # 其他原始數據
-            target_subdir = "raw_data"
-        
-        # 目標路徑
-        target_path = os.path.join(target_dir, target_subdir, file_name)
-        
-        # 執行或模擬移動操作
-        if dry_run:
-            print(f"將移動: {file_path} -> {target_path}")
-        else:
-            print(f"移動: {file_path} -> {target_path}")
-            shutil.copy2(file_path, target_path)  # 使用copy2保留元數據
+    moved = {}
+    try:
+        for file_path in csv_files:
+            file_name = os.path.basename(file_path)
+            
+            # 確定目標子目錄
+            target_subdir = classify_csv(file_name)
+            
+            # 目標路徑
+            target_path = os.path.join(target_dir, target_subdir, file_name)
+            
+            # 執行或模擬移動操作
+            if dry_run:
+                print(f"將移動: {file_path} -> {target_path}")
+            else:
+                print(f"{'移動' if move else '複製'}: {file_path} -> {target_path}")
+                dir_fd = dir_fds[target_subdir]
+                transfer(file_path, target_path if dir_fd is None else file_name, move, dir_fd)
+                moved[file_path] = target_path
+    finally:
+        for fd in dir_fds.values():
+            if fd is not None:
+                os.close(fd)
+    
+    return moved
 
 def main():
     """主程式"""
@@ -80,31 +83,11 @@ def main():
     if args.dry_run:
         print("=== 試運行模式，不會執行實際操作 ===")
     
-    organize_csv_files(args.source, args.target, args.dry_run)
-    
-    # 如果選擇移動文件而不是複製
-    if args.move and not args.dry_run:
-        print("\n=== 刪除原始文件 ===")
-        csv_files = glob.glob(os.path.join(args.source, "*.csv"))
-        for file_path in csv_files:
-            target_exists = False
-            file_name = os.path.basename(file_path)
-            
-            # 檢查文件是否已成功複製
-            for subdir in ["standard_evaluation", "method_comparison", "analysis_results", "raw_data"]:
-                check_path = os.path.join(args.target, subdir, file_name)
-                if os.path.exists(check_path):
-                    target_exists = True
-                    break
-            
-            if target_exists:
-                print(f"刪除: {file_path}")
-                os.remove(file_path)
-            else:
-                print(f"警告: 文件可能未成功複製，不刪除: {file_path}")
+    moved = organize_csv_files(args.source, args.target, args.dry_run, args.move)
     
     print("\n=== 文件整理完成 ===")
     if not args.dry_run:
+        print(f"共{'移動' if args.move else '複製'} {len(moved)} 個文件")
         print(f"整理後的文件位於: {args.target}")
 
 if __name__ == "__main__":
@@ -9,9 +9,9 @@
 import os
 import argparse
 import json
-from pathlib import Path
 
-from src.experiment.experiment_runner import NoiseReductionExperiment
+from src.experiment.experiment_runner import NoiseReductionExperiment, find_audio_files
+from src.utils.visualization import DEFAULT_PLOT_DPI
 
 def main():
     """主程式入口"""
@@ -37,6 +37,13 @@ def main():
                         help="生成可視化結果")
     parser.add_argument("--config", type=str, default=None,
                         help="配置文件路徑 (JSON 格式)")
+    parser.add_argument("--max_workers", type=int, default=os.cpu_count(),
+                        help="並行處理文件的進程數 (1 表示不並行)")
+    parser.add_argument("--stft_backend", type=str, default="librosa",
+                        choices=["librosa", "scipy", "torch"],
+                        help="STFT 計算後端 (torch 需要另外安裝，有 GPU 時自動使用)")
+    parser.add_argument("--plot_dpi", type=int, default=DEFAULT_PLOT_DPI,
+                        help="圖表輸出解析度 (發佈用圖表可設為 300)")
     
     args = parser.parse_args()
     
@@ -52,49 +59,49 @@ def main():
             "output_dir": args.output_dir,
             "temp_dir": args.temp_dir,
             "selected_method": args.method,
-            "create_plots": args.visualize
+            "create_plots": args.visualize,
+            "max_workers": args.max_workers,
+            "stft_backend": args.stft_backend,
+            "plot_dpi": args.plot_dpi
         }
     
-    # 初始化實驗
-    experiment = NoiseReductionExperiment(config)
-    
-    # 執行實驗
-    if args.compare:
-        print("=== 比較不同降噪方法 ===")
-        # 查找所有音頻文件
-        input_files = []
-        for ext in [".wav", ".mp3"]:
-            input_files.extend(list(Path(args.input_dir).glob(f"*{ext}")))
-        
-        if input_files:
-            comparison_df = experiment.compare_methods(input_files)
-            
-            # 顯示比較結果
-            print("\n=== 方法比較結果 ===")
-            print(comparison_df[["method", "avg_snr_improvement", "compliance_rate"]].round(2))
+    # 初始化實驗 (結束時等待後台寫入完成並關閉線程池)
+    with NoiseReductionExperiment(config) as experiment:
+        # 執行實驗
+        if args.compare:
+            print("=== 比較不同降噪方法 ===")
+            # 查找所有音頻文件
+            input_files = find_audio_files(args.input_dir)
             
-            # 找出最佳方法
-            best_method = comparison_df.sort_values("avg_snr_improvement", ascending=False).iloc[0]["method"]
-            print(f"\n推薦方法: {best_method}")
+            if input_files:
+                comparison_df = experiment.compare_methods(input_files)
+                
+                # 顯示比較結果
+                print("\n=== 方法比較結果 ===")
+                print(comparison_df[["method", "avg_snr_improvement", "compliance_rate"]].round(2))
+                
+                # 找出最佳方法
+                best_method = comparison_df.sort_values("avg_snr_improvement", ascending=False).iloc[0]["method"]
+                print(f"\n推薦方法: {best_method}")
+            else:
+                print(f"錯誤: 未在 {args.input_dir} 中找到音頻文件")
         else:
-            print(f"錯誤: 未在 {args.input_dir} 中找到音頻文件")
-    else:
-        print(f"=== 使用 {args.method} 方法執行降噪 ===")
-        results_df = experiment.run_experiment()
-        
-        if results_df is not None:
-            # 顯示簡要結果
-            improved_files = results_df[results_df["snr_improvement"] > 0].shape[0]
-            total_files = results_df.shape[0]
-            
-            print(f"\n處理了 {total_files} 個文件，其中 {improved_files} 個 ({improved_files/total_files*100:.1f}%) 有SNR改善")
-            print(f"平均SNR改善: {results_df['snr_improvement'].mean():.2f} dB")
-            
-            # 顯示符合標準的文件數量
-            compliant_before = results_df[results_df["original_compliant"]].shape[0]
-            compliant_after = results_df[results_df["processed_compliant"]].shape[0]
+            print(f"=== 使用 {args.method} 方法執行降噪 ===")
+            results_df = experiment.run_experiment()
             
-            print(f"符合標準的文件: {compliant_before} -> {compliant_after} ({(compliant_after-compliant_before)/total_files*100:.1f}% 改善)")
+            if results_df is not None:
+                # 顯示簡要結果
+                improved_files = results_df[results_df["snr_improvement"] > 0].shape[0]
+                total_files = results_df.shape[0]
+                
+                print(f"\n處理了 {total_files} 個文件，其中 {improved_files} 個 ({improved_files/total_files*100:.1f}%) 有SNR改善")
+                print(f"平均SNR改善: {results_df['snr_improvement'].mean():.2f} dB")
+                
+                # 顯示符合標準的文件數量
+                compliant_before = results_df[results_df["original_compliant"]].shape[0]
+                compliant_after = results_df[results_df["processed_compliant"]].shape[0]
+                
+                print(f"符合標準的文件: {compliant_before} -> {compliant_after} ({(compliant_after-compliant_before)/total_files*100:.1f}% 改善)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
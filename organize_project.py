@@ -7,14 +7,16 @@
 """
 
 import os
-import shutil
 import argparse
-import glob
-import re
 from pathlib import Path
 import sys
 from tqdm import tqdm
 
+from src.utils.fs_ops import classify_csv, scan_files, open_dir, transfer
+
+# 支持整理的音頻文件擴展名
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg"}
+
 def create_directory_structure(base_dir="."):
     """
     創建標準化的專案目錄結構
@@ -41,87 +43,108 @@ def create_directory_structure(base_dir="."):
         os.makedirs(dir_path, exist_ok=True)
         print(f"  創建: {dir_path}")
 
-def organize_csv_files(base_dir=".", dry_run=False):
+def organize_csv_files(base_dir=".", dry_run=False, move=False):
     """
     整理CSV文件到適當的目錄
     
     參數:
         base_dir: 專案根目錄
         dry_run: 如果為True，只顯示將執行的操作而不實際移動文件
+        move: 如果為True，移動文件而不是複製
+        
+    返回值:
+        moved: 字典 {源文件路徑: 目標文件路徑}，僅包含實際傳輸的文件
     """
     # 查找根目錄下的所有CSV文件
-    csv_files = glob.glob(os.path.join(base_dir, "*.csv"))
+    csv_files = [path for _, path, ext in scan_files(base_dir) if ext == ".csv"]
     
     if not csv_files:
         print("未找到CSV文件")
-        return
+        return {}
     
     print(f"找到 {len(csv_files)} 個CSV文件，開始分類...")
     
-    for file_path in tqdm(csv_files, desc="整理CSV文件"):
-        file_name = os.path.basename(file_path)
-        
-        # 根據文件名分類
-        if "standard" in file_name.lower() and "noise_reduction" in file_name.lower():
-            # 標準評估結果
-            target_dir = os.path.join(base_dir, "results/standard_evaluation")
-        elif "comparison" in file_name.lower() or "compare" in file_name.lower():
-            # 方法比較結果
-            target_dir = os.path.join(base_dir, "results/method_comparison")
-        elif "analysis" in file_name.lower():
-            # 分析結果
-            target_dir = os.path.join(base_dir, "results/analysis_results")
-        else:
-            # 其他原始數據
-            target_dir = os.path.join(base_dir, "results/raw_data")
-        
-        target_path = os.path.join(target_dir, file_name)
-        
-        if dry_run:
-            print(f"將移動: {file_path} -> {target_path}")
-        else:
-            shutil.copy2(file_path, target_path)
+    # 每個目標子目錄只打開一次，後續以目錄文件描述符創建目標文件
+    dir_fds = {}
+    if not dry_run:
+        for subdir in ("standard_evaluation", "method_comparison", "analysis_results", "raw_data"):
+            dir_fds[subdir] = open_dir(os.path.join(base_dir, "results", subdir))
+    
+    moved = {}
+    try:
+        for file_path in tqdm(csv_files, desc="整理CSV文件"):
+            file_name = os.path.basename(file_path)
+            
+            # 根據文件名分類
+            target_subdir = classify_csv(file_name)
+            target_path = os.path.join(base_dir, "results", target_subdir, file_name)
+            
+            if dry_run:
+                print(f"將移動: {file_path} -> {target_path}")
+            else:
+                dir_fd = dir_fds[target_subdir]
+                transfer(file_path, target_path if dir_fd is None else file_name, move, dir_fd)
+                moved[file_path] = target_path
+    finally:
+        for fd in dir_fds.values():
+            if fd is not None:
+                os.close(fd)
+    
+    return moved
 
-def organize_audio_files(base_dir=".", dry_run=False):
+def organize_audio_files(base_dir=".", dry_run=False, move=False):
     """
     整理音頻文件到適當的目錄
     
     參數:
         base_dir: 專案根目錄
         dry_run: 如果為True，只顯示將執行的操作而不實際移動文件
+        move: 如果為True，移動文件而不是複製
+        
+    返回值:
+        moved: 字典 {源文件路徑: 目標文件路徑}，僅包含實際傳輸的文件
     """
-    # 查找所有音頻文件
-    audio_extensions = ["*.wav", "*.mp3", "*.flac", "*.ogg"]
-    audio_files = []
-    
-    for ext in audio_extensions:
-        audio_files.extend(glob.glob(os.path.join(base_dir, ext)))
+    # 查找所有音頻文件 (單次掃描按擴展名分類)
+    audio_files = [path for _, path, ext in scan_files(base_dir) if ext in AUDIO_EXTENSIONS]
     
     if not audio_files:
         print("未找到音頻文件")
-        return
+        return {}
     
     print(f"找到 {len(audio_files)} 個音頻文件，開始分類...")
     
-    # 音頻目標目錄
+    # 音頻目標目錄 (各打開一次)
     paired_dir = os.path.join(base_dir, "data/audio_paired")
     samples_dir = os.path.join(base_dir, "data/audio_samples")
-    
-    for file_path in tqdm(audio_files, desc="整理音頻文件"):
-        file_name = os.path.basename(file_path)
-        
-        # 判斷是否為成對音頻
-        if "teacher" in file_name.lower() or "student" in file_name.lower():
-            target_dir = paired_dir
-        else:
-            target_dir = samples_dir
-        
-        target_path = os.path.join(target_dir, file_name)
-        
-        if dry_run:
-            print(f"將移動: {file_path} -> {target_path}")
-        else:
-            shutil.copy2(file_path, target_path)
+    dir_fds = {}
+    if not dry_run:
+        dir_fds = {paired_dir: open_dir(paired_dir), samples_dir: open_dir(samples_dir)}
+    
+    moved = {}
+    try:
+        for file_path in tqdm(audio_files, desc="整理音頻文件"):
+            file_name = os.path.basename(file_path)
+            
+            # 判斷是否為成對音頻
+            if "teacher" in file_name.lower() or "student" in file_name.lower():
+                target_dir = paired_dir
+            else:
+                target_dir = samples_dir
+            
+            target_path = os.path.join(target_dir, file_name)
+            
+            if dry_run:
+                print(f"將移動: {file_path} -> {target_path}")
+            else:
+                dir_fd = dir_fds[target_dir]
+                transfer(file_path, target_path if dir_fd is None else file_name, move, dir_fd)
+                moved[file_path] = target_path
+    finally:
+        for fd in dir_fds.values():
+            if fd is not None:
+                os.close(fd)
+    
+    return moved
 
 def organize_python_files(base_dir=".", dry_run=False):
     """
@@ -132,12 +155,11 @@ def organize_python_files(base_dir=".", dry_run=False):
         dry_run: 如果為True，只顯示將執行的操作而不實際移動文件
     """
     # 獲取根目錄中的主要Python文件 (跳過我們剛建立的文件)
-    skip_files = ["main.py", "data_organizer.py", "file_organizer.py", "organize_project.py"]
-    python_files = []
-    
-    for py_file in glob.glob(os.path.join(base_dir, "*.py")):
-        if os.path.basename(py_file) not in skip_files:
-            python_files.append(py_file)
+    skip_files = {"main.py", "data_organizer.py", "file_organizer.py", "organize_project.py"}
+    python_files = [
+        path for name, path, ext in scan_files(base_dir)
+        if ext == ".py" and name not in skip_files
+    ]
     
     # 創建備份目錄
     if not dry_run:
@@ -153,7 +175,7 @@ def organize_python_files(base_dir=".", dry_run=False):
         if dry_run:
             print(f"將備份: {file_path} -> {backup_path}")
         else:
-            shutil.copy2(file_path, backup_path)
+            transfer(file_path, backup_path)
             print(f"已備份: {file_path} -> {backup_path}")
 
 def check_files_exist(base_dir="."):
@@ -191,39 +213,29 @@ def check_files_exist(base_dir="."):
     
     return True
 
-def clean_up_original_files(base_dir=".", dry_run=False):
+def confirm_clean():
     """
-    清理已移動的原始文件
+    詢問用戶是否在整理時刪除原始文件
+    
+    返回值:
+        布爾值，用戶確認時為True
+    """
+    confirm = input("確認整理後刪除原始文件? (y/n): ")
+    if confirm.lower() != 'y':
+        print("取消刪除操作，將保留原始文件")
+        return False
+    return True
+
+def preview_clean_up(base_dir="."):
+    """
+    試運行時列出 --clean 將移走 (整理後不再保留) 的原始文件
     
     參數:
         base_dir: 專案根目錄
-        dry_run: 如果為True，只顯示將執行的操作而不實際刪除文件
     """
-    # 詢問用戶確認
-    if not dry_run:
-        confirm = input("確認刪除已移動的原始文件? (y/n): ")
-        if confirm.lower() != 'y':
-            print("取消刪除操作")
-            return
-    
-    # 刪除已移動的CSV文件
-    csv_files = glob.glob(os.path.join(base_dir, "*.csv"))
-    for file_path in csv_files:
-        if dry_run:
+    for _, file_path, ext in scan_files(base_dir):
+        if ext == ".csv" or ext in AUDIO_EXTENSIONS:
             print(f"將刪除: {file_path}")
-        else:
-            os.remove(file_path)
-            print(f"已刪除: {file_path}")
-    
-    # 刪除已移動的音頻文件
-    audio_extensions = ["*.wav", "*.mp3", "*.flac", "*.ogg"]
-    for ext in audio_extensions:
-        for file_path in glob.glob(os.path.join(base_dir, ext)):
-            if dry_run:
-                print(f"將刪除: {file_path}")
-            else:
-                os.remove(file_path)
-                print(f"已刪除: {file_path}")
 
 def main():
     """主程式"""
@@ -234,7 +246,7 @@ def main():
     parser.add_argument("--dry-run", action="store_true",
                         help="只顯示將執行的操作而不實際修改文件系統")
     parser.add_argument("--clean", action="store_true",
-                        help="清理已移動的原始文件")
+                        help="移動文件而不是複製 (整理後不保留原始文件)")
     
     args = parser.parse_args()
     
@@ -246,14 +258,17 @@ def main():
         print(f"錯誤: 目錄 {args.dir} 不存在")
         sys.exit(1)
     
+    # 清理原始文件: 確認後直接移動文件 (同一文件系統內只需重命名)，而不是複製後再刪除
+    move = args.clean and not args.dry_run and confirm_clean()
+    
     # 建立目錄結構
     create_directory_structure(args.dir)
     
     # 整理CSV文件
-    organize_csv_files(args.dir, args.dry_run)
+    moved = organize_csv_files(args.dir, args.dry_run, move)
     
     # 整理音頻文件
-    organize_audio_files(args.dir, args.dry_run)
+    moved.update(organize_audio_files(args.dir, args.dry_run, move))
     
     # 備份Python文件
     organize_python_files(args.dir, args.dry_run)
@@ -261,11 +276,14 @@ def main():
     # 檢查重要文件
     check_files_exist(args.dir)
     
-    print("\n=== 專案整理完成 ===")
+    # 試運行時預覽清理將移走的原始文件
+    if args.dry_run and args.clean:
+        print("\n=== 清理原始文件 (試運行) ===")
+        preview_clean_up(args.dir)
     
-    # 清理原始文件
-    if args.clean and not args.dry_run:
-        clean_up_original_files(args.dir, args.dry_run)
+    print("\n=== 專案整理完成 ===")
+    if not args.dry_run:
+        print(f"共{'移動' if move else '複製'} {len(moved)} 個數據文件")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+數值計算核心
+以 Numba 編譯的熱點計算，未安裝 numba 時退回 NumPy 實現
+"""
+
+import numpy as np
+import librosa
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _audio_stats_numba(x):
+        total = 0.0
+        sumsq = 0.0
+        maxabs = 0.0
+        sumabs = 0.0
+        for i in prange(x.shape[0]):
+            v = np.float64(x[i])
+            a = abs(v)
+            total += v
+            sumsq += v * v
+            sumabs += a
+            maxabs = max(maxabs, a)
+        return total, sumsq, maxabs, sumabs
+
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _spectral_subtract_numba(stft, noise_spec, floor):
+        n_bins, n_frames = stft.shape
+        for t in prange(n_frames):
+            for f in range(n_bins):
+                x = stft[f, t]
+                mag = abs(x)
+                gain = floor
+                if mag > 0:
+                    gain = max(1.0 - noise_spec[f] / mag, floor)
+                stft[f, t] = x * gain
+
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _frame_energy_numba(x, frame_length, hop_length, n_frames):
+        out = np.empty(n_frames, dtype=np.float64)
+        for i in prange(n_frames):
+            start = i * hop_length
+            s = 0.0
+            for k in range(frame_length):
+                v = np.float64(x[start + k])
+                s += v * v
+            out[i] = s
+        return out
+
+def _compute_improvements_python(o_rms, o_peak, o_snr, o_cv, p_rms, p_peak, p_snr, p_cv):
+    rms = (p_rms - o_rms) / o_rms * 100.0 if o_rms > 0 else 0.0
+    peak = (p_peak - o_peak) / o_peak * 100.0 if o_peak > 0 else 0.0
+    cv = (p_cv - o_cv) / o_cv * 100.0 if o_cv > 0 else 0.0
+    return rms, peak, p_snr - o_snr, cv
+
+if HAS_NUMBA:
+    _compute_improvements_numba = njit(cache=True)(_compute_improvements_python)
+
+def _audio_stats_numpy(x):
+    abs_x = np.abs(x)
+    total = float(np.sum(x, dtype=np.float64))
+    sumsq = float(np.sum(np.square(x, dtype=np.float64)))
+    maxabs = float(np.max(abs_x)) if len(x) > 0 else 0.0
+    sumabs = float(np.sum(abs_x, dtype=np.float64))
+    return total, sumsq, maxabs, sumabs
+
+def audio_stats(x):
+    """
+    單次掃描計算音頻的基本歸約統計量
+
+    參數:
+        x: 一維音頻數據
+
+    返回值:
+        (sum, sumsq, maxabs, sumabs): 總和、平方和、最大絕對值、絕對值總和 (float64 累加)
+    """
+    if HAS_NUMBA:
+        total, sumsq, maxabs, sumabs = _audio_stats_numba(x)
+        return float(total), float(sumsq), float(maxabs), float(sumabs)
+    return _audio_stats_numpy(x)
+
+def frame_energy(x, frame_length, hop_length):
+    """
+    計算短時幀能量 (每幀平方和)
+
+    參數:
+        x: 一維音頻數據
+        frame_length: 幀長 (樣本數)
+        hop_length: 幀移 (樣本數)
+
+    返回值:
+        energy: 每幀能量
+    """
+    n_frames = 1 + (len(x) - frame_length) // hop_length
+    if n_frames <= 0:
+        return np.zeros(0)
+    if HAS_NUMBA:
+        return _frame_energy_numba(x, frame_length, hop_length, n_frames)
+    # 幀是原數據的視圖，einsum 直接做平方和歸約，不產生平方後的臨時數組
+    frames = librosa.util.frame(x, frame_length=frame_length, hop_length=hop_length)
+    return np.einsum('ij,ij->j', frames, frames)
+
+def frame_energy_db(x, frame_length, hop_length):
+    """
+    計算短時幀能量並轉換為相對最大值的分貝
+
+    參數:
+        x: 一維音頻數據
+        frame_length: 幀長 (樣本數)
+        hop_length: 幀移 (樣本數)
+
+    返回值:
+        energy_db: 每幀能量 (dB，相對最大幀能量)
+    """
+    return librosa.amplitude_to_db(frame_energy(x, frame_length, hop_length), ref=np.max)
+
+def mask_runs(mask):
+    """
+    找出布爾掩碼中所有連續為 True 的區段
+
+    參數:
+        mask: 一維布爾數組
+
+    返回值:
+        (starts, ends): 各區段的起始索引和結束索引 (不含)
+    """
+    d = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(d == 1), np.flatnonzero(d == -1)
+
+def _spectral_subtract_numpy(stft, noise_spec, floor):
+    gain = np.abs(stft)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(noise_spec[:, None], gain, out=gain)
+    np.subtract(1.0, gain, out=gain)
+    np.fmax(gain, floor, out=gain)  # fmax 將 0/0 產生的 NaN 視為下限
+    stft *= gain
+
+def spectral_subtract(stft, noise_spec, floor=0.01):
+    """
+    原地對 STFT 應用頻譜減法增益 max(1 - N/|X|, floor)
+    
+    等價於 max(|X| - N, floor * |X|) * X/|X|，但不需要額外的幅度或相位數組。
+    Numba 版本逐幀並行，一次掃描完成增益計算和縮放。
+
+    參數:
+        stft: 複數 STFT 矩陣 (頻率, 幀)，會被原地修改
+        noise_spec: 一維噪聲幅度譜 (頻率,)
+        floor: 增益下限
+    """
+    noise_spec = np.ascontiguousarray(noise_spec, dtype=np.float32).reshape(-1)
+    if HAS_NUMBA:
+        _spectral_subtract_numba(stft, noise_spec, floor)
+    else:
+        _spectral_subtract_numpy(stft, noise_spec, floor)
+
+def compute_improvements(o_rms, o_peak, o_snr, o_cv, p_rms, p_peak, p_snr, p_cv):
+    """
+    計算處理前後的改善程度
+
+    參數:
+        o_rms, o_peak, o_snr, o_cv: 原始音頻的 RMS、峰值、信噪比、變異係數
+        p_rms, p_peak, p_snr, p_cv: 處理後音頻的對應指標
+
+    返回值:
+        (rms, peak, snr, cv): RMS、峰值、變異係數的百分比變化 (原始值不為正時為0) 和信噪比差值
+    """
+    args = tuple(float(v) for v in (o_rms, o_peak, o_snr, o_cv, p_rms, p_peak, p_snr, p_cv))
+    if HAS_NUMBA:
+        return _compute_improvements_numba(*args)
+    return _compute_improvements_python(*args)
+
+def limit_threads(n_threads=1):
+    """限制 Numba 並行核心使用的線程數 (用於多進程工作者，避免過度訂閱)"""
+    if HAS_NUMBA:
+        import numba
+        numba.set_num_threads(n_threads)
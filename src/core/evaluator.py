@@ -7,8 +7,11 @@
 """
 
 import numpy as np
+
 import librosa
 
+from src.core._kernels import audio_stats, frame_energy_db, mask_runs
+
 class AudioEvaluator:
     """音頻評估器基類"""
     
@@ -87,6 +90,61 @@ class AudioEvaluator:
         snr = 10 * np.log10(signal_power / noise_power) if noise_power > 0 else 100
         return snr
     
+    def calculate_basic_metrics(self, audio_data):
+        """
+        單次掃描計算 RMS、峰值、變異係數和信噪比
+        
+        參數:
+            audio_data: 音頻數據
+            
+        返回值:
+            metrics: 包含 rms, rms_db, peak, peak_db, cv, snr 的字典
+        """
+        total, sumsq, maxabs, sumabs = audio_stats(audio_data)
+        return self.metrics_from_stats(len(audio_data), total, sumsq, maxabs, sumabs)
+    
+    def metrics_from_stats(self, n, total, sumsq, maxabs, sumabs):
+        """
+        由歸約統計量推導 RMS、峰值、變異係數和信噪比 (可用於分塊累加的統計量)
+        
+        參數:
+            n: 樣本數
+            total: 樣本總和
+            sumsq: 樣本平方和
+            maxabs: 最大絕對值
+            sumabs: 絕對值總和
+            
+        返回值:
+            metrics: 包含 rms, rms_db, peak, peak_db, cv, snr 的字典
+        """
+        # 由歸約量推導各指標 (與 calculate_* 方法的定義相同)
+        mean = total / n if n > 0 else 0.0
+        mean_sq = sumsq / n if n > 0 else 0.0
+        mean_abs = sumabs / n if n > 0 else 0.0
+        
+        rms = np.sqrt(mean_sq)
+        rms_db = 20 * np.log10(rms) if rms > 0 else -100
+        
+        peak = maxabs
+        peak_db = 20 * np.log10(peak) if peak > 0 else -100
+        
+        if mean_abs > 0:
+            cv = np.sqrt(max(mean_sq - mean_abs**2, 0.0)) / mean_abs
+        else:
+            cv = 1.0
+        
+        noise_power = mean_sq - mean**2
+        snr = 10 * np.log10(mean_sq / noise_power) if noise_power > 0 else 100
+        
+        return {
+            'rms': rms,
+            'rms_db': rms_db,
+            'peak': peak,
+            'peak_db': peak_db,
+            'cv': cv,
+            'snr': snr
+        }
+    
     def detect_silence(self, audio_data, sr, threshold_db=-45):
         """
         檢測靜音比例和最大靜音段
@@ -104,72 +162,109 @@ class AudioEvaluator:
         frame_length = int(0.02 * sr)  # 20ms
         hop_length = int(0.01 * sr)    # 10ms
         
-        frames = librosa.util.frame(audio_data, frame_length=frame_length, hop_length=hop_length)
-        energy = np.sum(frames**2, axis=0)
-        energy_db = librosa.amplitude_to_db(energy, ref=np.max)
+        energy_db = frame_energy_db(audio_data, frame_length, hop_length)
+        
+        return self.silence_from_energy_db(energy_db, hop_length, sr, threshold_db)
+    
+    def silence_from_energy_db(self, energy_db, hop_length, sr, threshold_db=-45):
+        """
+        由幀能量 (dB) 計算靜音比例和最大靜音段
         
+        參數:
+            energy_db: 每幀能量 (dB，相對最大幀能量)
+            hop_length: 幀移 (樣本數)
+            sr: 採樣率
+            threshold_db: 靜音閾值(dB)
+            
+        返回值:
+            non_speech_ratio: 靜音比例
+            max_silence: 最大靜音段(秒)
+        """
         # 檢測靜音
         silence_mask = energy_db < threshold_db
         
         # 計算靜音比例
-        non_speech_ratio = np.sum(silence_mask) / len(silence_mask)
+        non_speech_ratio = silence_mask.mean()
         
         # 找出最長的靜音段
-        max_silence_frames = 0
-        current_silence = 0
-        
-        for is_silence in silence_mask:
-            if is_silence:
-                current_silence += 1
-            else:
-                max_silence_frames = max(max_silence_frames, current_silence)
-                current_silence = 0
-                
-        # 處理最後可能的靜音段
-        max_silence_frames = max(max_silence_frames, current_silence)
-        
+        starts, ends = mask_runs(silence_mask)
+        max_silence_frames = int((ends - starts).max(initial=0))
+
         # 轉換為秒
         max_silence = max_silence_frames * hop_length / sr
         
         return non_speech_ratio, max_silence
     
-    def evaluate_audio(self, audio_data, sr):
+    def evaluate_audio(self, audio_data, sr, fast_reject=False):
         """
         全面評估音頻質量
         
         參數:
             audio_data: 音頻數據
             sr: 採樣率
+            fast_reject: 如果為True，低成本指標已不符合標準時跳過靜音分析，
+                         此時 non_speech_ratio 和 max_silence 為 NaN (生成報告時應保持False)
             
         返回值:
             metrics: 評估指標字典
             compliant: 是否符合標準
         """
-        # 計算指標
-        rms, rms_db = self.calculate_rms(audio_data)
-        peak, peak_db = self.calculate_peak(audio_data)
-        cv = self.calculate_cv(audio_data)
-        snr = self.estimate_snr(audio_data)
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+        
+        # 計算指標 (RMS、峰值、CV、SNR 共用一次掃描)
+        metrics = self.calculate_basic_metrics(audio_data)
+        
+        # 檢查低成本指標是否符合標準
+        basic_compliant = self._basic_compliant(metrics)
+        
+        # 提前拒絕，跳過成本最高的靜音分析
+        if fast_reject and not basic_compliant:
+            metrics['non_speech_ratio'] = np.nan
+            metrics['max_silence'] = np.nan
+            return metrics, False
+        
         non_speech_ratio, max_silence = self.detect_silence(audio_data, sr)
         
-        # 收集指標
-        metrics = {
-            'rms': rms,
-            'rms_db': rms_db,
-            'peak': peak,
-            'peak_db': peak_db,
-            'cv': cv,
-            'snr': snr,
-            'non_speech_ratio': non_speech_ratio,
-            'max_silence': max_silence
-        }
+        return self._finish_evaluation(metrics, basic_compliant, non_speech_ratio, max_silence)
+    
+    def evaluate_stats(self, stats, sr):
+        """
+        以分塊累加的統計量評估音頻質量 (用於不把整個文件讀入內存的流式處理)
+        
+        參數:
+            stats: 統計量字典 {'n', 'sum', 'sumsq', 'maxabs', 'sumabs', 'frame_energy'}，
+                   frame_energy 為 20ms 幀、10ms 幀移的幀能量 (平方和)
+            sr: 採樣率
+            
+        返回值:
+            metrics: 評估指標字典
+            compliant: 是否符合標準
+        """
+        metrics = self.metrics_from_stats(stats['n'], stats['sum'], stats['sumsq'],
+                                          stats['maxabs'], stats['sumabs'])
+        basic_compliant = self._basic_compliant(metrics)
+        
+        energy_db = librosa.amplitude_to_db(stats['frame_energy'], ref=np.max)
+        non_speech_ratio, max_silence = self.silence_from_energy_db(energy_db, int(0.01 * sr), sr)
+        
+        return self._finish_evaluation(metrics, basic_compliant, non_speech_ratio, max_silence)
+    
+    def _basic_compliant(self, metrics):
+        """檢查低成本指標 (RMS、峰值、CV、SNR) 是否符合標準"""
+        return (
+            metrics['rms_db'] >= self.standards['rms_db'] and
+            metrics['peak_db'] <= self.standards['peak_db'] and
+            metrics['cv'] <= self.standards['cv'] and
+            metrics['snr'] >= self.standards['snr']
+        )
+    
+    def _finish_evaluation(self, metrics, basic_compliant, non_speech_ratio, max_silence):
+        """收集靜音指標並檢查是否符合全部標準"""
+        metrics['non_speech_ratio'] = non_speech_ratio
+        metrics['max_silence'] = max_silence
         
-        # 檢查是否符合標準
         compliant = (
-            rms_db >= self.standards['rms_db'] and
-            peak_db <= self.standards['peak_db'] and
-            cv <= self.standards['cv'] and
-            snr >= self.standards['snr'] and
+            basic_compliant and
             non_speech_ratio <= self.standards['non_speech_ratio'] and
             max_silence <= self.standards['max_silence']
         )
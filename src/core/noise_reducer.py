@@ -6,35 +6,58 @@
 實現多種音頻降噪算法
 """
 
+import functools
 import numpy as np
 import librosa
+import pywt
 from scipy import signal
 import warnings
 
+from src.core._kernels import frame_energy_db, mask_runs, spectral_subtract
+
 # 忽略警告
 warnings.filterwarnings("ignore")
 
+@functools.lru_cache(maxsize=4)
+def _get_window(n_fft):
+    """取得 (並緩存) 指定長度的 Hann 窗"""
+    return signal.get_window('hann', n_fft).astype(np.float32)
+
 class NoiseReducer:
     """核心降噪處理器"""
     
-    def __init__(self, sample_rate=44100):
-        """初始化降噪處理器"""
+    def __init__(self, sample_rate=44100, stft_backend='librosa'):
+        """
+        初始化降噪處理器
+        
+        參數:
+            sample_rate: 採樣率
+            stft_backend: STFT 計算後端 ('librosa'、'scipy' 或 'torch'，torch 有 GPU 時自動使用)
+        """
         self.sample_rate = sample_rate
+        self.stft_backend = stft_backend
         self.silence_threshold_db = -45
         self.wavelet_threshold_mult = 2.5
         self.target_snr = 20
+        self.n_fft = 2048
+        self.hop_length = 512
+        self.noise_max_runs = 8            # 估計噪聲譜時最多使用的靜音段數
+        self.noise_frames_per_run = 16     # 每個靜音段最多使用的 STFT 幀數
     
-    def detect_silence(self, audio_data, threshold_db=None):
+    def detect_silence(self, audio_data, threshold_db=None, return_runs=False):
         """
         檢測音頻中的靜音部分
         
         參數:
             audio_data: 音頻數據
             threshold_db: 靜音閾值 (dB)
+            return_runs: 如果為True，返回靜音區段的樣本索引而不是完整掩碼
             
         返回值:
             silence_mask: 靜音掩碼 (布爾數組)
+            或 (starts, ends): 靜音區段的起始和結束樣本索引 (return_runs=True 時)
         """
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
         if threshold_db is None:
             threshold_db = self.silence_threshold_db
             
@@ -42,65 +65,165 @@ class NoiseReducer:
         frame_length = int(0.02 * self.sample_rate)  # 20ms
         hop_length = int(0.01 * self.sample_rate)    # 10ms
         
-        frames = librosa.util.frame(audio_data, frame_length=frame_length, hop_length=hop_length)
-        energy = np.sum(frames**2, axis=0)
-        energy_db = librosa.amplitude_to_db(energy, ref=np.max)
+        energy_db = frame_energy_db(audio_data, frame_length, hop_length)
         
         # 檢測靜音
         silence_mask = energy_db < threshold_db
         
-        # 擴展掩碼到原始音頻長度
-        full_mask = np.zeros(len(audio_data), dtype=bool)
-        for i, is_silence in enumerate(silence_mask):
-            start = i * hop_length
-            end = min(start + frame_length, len(audio_data))
-            if is_silence:
-                full_mask[start:end] = True
+        n = len(audio_data)
+        
+        # 把連續靜音幀換算為樣本區段並合併重疊或相接的區段
+        frame_starts, frame_ends = mask_runs(silence_mask)
+        starts = frame_starts * hop_length
+        ends = np.minimum((frame_ends - 1) * hop_length + frame_length, n)
+        if len(starts) > 1:
+            idx = np.flatnonzero(np.concatenate(([True], starts[1:] > ends[:-1])))
+            starts = starts[idx]
+            ends = np.maximum.reduceat(ends, idx)
+        
+        if return_runs:
+            return starts, ends
         
+        # 按區段填充預先分配的布爾掩碼 (不建立與音頻等長的臨時整數數組)
+        full_mask = np.zeros(n, dtype=bool)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            full_mask[start:end] = True
+
         return full_mask
     
-    def reduce_noise_standard(self, audio_data):
+    def _stft(self, audio_data, center=True):
         """
-        標準降噪 - 簡單的頻譜減法
+        按選擇的後端計算 STFT
         
         參數:
-            audio_data: 音頻數據
+            audio_data: 音頻數據 (float32)
+            center: 是否在兩端補零使幀居中
             
         返回值:
-            denoised_audio: 降噪後的音頻
+            stft: complex64 STFT 矩陣 (頻率, 幀)
         """
-        # 檢測靜音段落
-        silence_mask = self.detect_silence(audio_data)
+        window = _get_window(self.n_fft)
         
-        if np.sum(silence_mask) > 0:
-            # 從靜音段估計噪聲特徵
-            noise_sample = audio_data[silence_mask]
+        if self.stft_backend == 'scipy':
+            # scipy 的結果按窗口和縮放，噪聲譜和信號使用同一後端時頻譜減法增益不受影響
+            _, _, stft = signal.stft(audio_data, window=window, nperseg=self.n_fft,
+                                     noverlap=self.n_fft - self.hop_length,
+                                     boundary='zeros' if center else None, padded=center)
+            return stft.astype(np.complex64, copy=False)
+        
+        if self.stft_backend == 'torch':
+            import torch
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            stft = torch.stft(torch.from_numpy(audio_data).to(device), n_fft=self.n_fft,
+                              hop_length=self.hop_length, window=torch.from_numpy(window).to(device),
+                              center=center, pad_mode='constant', return_complex=True)
+            return stft.cpu().numpy()
+        
+        return librosa.stft(audio_data, n_fft=self.n_fft, hop_length=self.hop_length, window=window,
+                            center=center, dtype=np.complex64)
+    
+    def _istft(self, stft, length):
+        """
+        按選擇的後端計算逆 STFT (與 _stft(center=True) 對應)
+        
+        參數:
+            stft: complex64 STFT 矩陣
+            length: 輸出長度
             
-            # 計算短時傅立葉變換
-            n_fft = 2048
-            hop_length = 512
+        返回值:
+            audio_data: 重建的音頻 (float32)
+        """
+        window = _get_window(self.n_fft)
+        
+        if self.stft_backend == 'scipy':
+            _, audio_data = signal.istft(stft, window=window, nperseg=self.n_fft,
+                                         noverlap=self.n_fft - self.hop_length, boundary=True)
+            return librosa.util.fix_length(audio_data.astype(np.float32, copy=False), size=length)
+        
+        if self.stft_backend == 'torch':
+            import torch
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            audio_data = torch.istft(torch.from_numpy(stft).to(device), n_fft=self.n_fft,
+                                     hop_length=self.hop_length, window=torch.from_numpy(window).to(device),
+                                     center=True, length=length)
+            return audio_data.cpu().numpy()
+        
+        return librosa.istft(stft, hop_length=self.hop_length, window=window, length=length)
+    
+    def estimate_noise_spectrum(self, audio_data, silence_mask=None):
+        """
+        從靜音段估計平均噪聲幅度譜
+        
+        參數:
+            audio_data: 音頻數據
+            silence_mask: 靜音掩碼 (可選，未提供時自動檢測)
             
-            # 處理原始音頻
-            stft = librosa.stft(audio_data, n_fft=n_fft, hop_length=hop_length)
-            stft_mag, stft_phase = librosa.magphase(stft)
+        返回值:
+            noise_spec: 噪聲幅度譜 (n_fft // 2 + 1, 1)，沒有靜音段時為 None
+        """
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+        
+        # 只需要靜音區段，未提供掩碼時不建立完整的樣本級掩碼
+        if silence_mask is None:
+            starts, ends = self.detect_silence(audio_data, return_runs=True)
+        else:
+            starts, ends = mask_runs(silence_mask)
+        
+        if len(starts) == 0:
+            return None
+        
+        # 優先使用最長的幾段連續靜音 (每段至少一個完整 STFT 幀)，
+        # 直接對原始數據的切片視圖做不補邊的 STFT，避免拼接整個噪聲緩衝區
+        lengths = ends - starts
+        long_runs = np.flatnonzero(lengths >= self.n_fft)
+        
+        if len(long_runs) > 0:
+            chosen = long_runs[np.argsort(lengths[long_runs])[::-1][:self.noise_max_runs]]
+            max_len = self.n_fft + (self.noise_frames_per_run - 1) * self.hop_length
+            noise_mags = [
+                np.abs(self._stft(audio_data[starts[i]:min(ends[i], starts[i] + max_len)], center=False))
+                for i in chosen
+            ]
+            return np.mean(np.concatenate(noise_mags, axis=1), axis=1, keepdims=True)
+        
+        # 靜音段都太短時，退回拼接所有靜音樣本
+        noise_sample = np.concatenate([audio_data[s:e] for s, e in zip(starts, ends)])
+        noise_stft = self._stft(noise_sample)
+        return np.mean(np.abs(noise_stft), axis=1, keepdims=True)
+    
+    def reduce_noise_standard(self, audio_data, silence_mask=None, noise_spec=None):
+        """
+        標準降噪 - 簡單的頻譜減法
+        
+        參數:
+            audio_data: 音頻數據
+            silence_mask: 靜音掩碼 (可選，避免重複檢測)
+            noise_spec: 噪聲幅度譜 (可選，避免重複估計)
             
-            # 處理噪聲樣本
-            noise_stft = librosa.stft(noise_sample, n_fft=n_fft, hop_length=hop_length)
-            noise_mag = np.abs(noise_stft)
-            noise_spec = np.mean(noise_mag, axis=1)
-            noise_spec = np.expand_dims(noise_spec, 1)
+        返回值:
+            denoised_audio: 降噪後的音頻
+        """
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+        
+        # 從靜音段估計噪聲特徵
+        if noise_spec is None:
+            noise_spec = self.estimate_noise_spectrum(audio_data, silence_mask)
+        
+        if noise_spec is not None:
+            # 處理原始音頻 (以 complex64 計算以減少頻譜圖的記憶體流量)
+            stft = self._stft(audio_data)
             
-            # 應用頻譜減法
-            masked_stft_mag = np.maximum(stft_mag - noise_spec, 0.01 * stft_mag)
+            # 應用頻譜減法: max(|X| - N, 0.01|X|) * X/|X| 等於實數增益 max(1 - N/|X|, 0.01) 乘以 X，
+            # 由編譯核心逐幀原地縮放 STFT，不需要額外的幅度或相位數組
+            spectral_subtract(stft, noise_spec, floor=0.01)
             
             # 重建音頻
-            masked_stft = masked_stft_mag * np.exp(1j * np.angle(stft))
-            denoised_audio = librosa.istft(masked_stft, hop_length=hop_length, length=len(audio_data))
+            denoised_audio = self._istft(stft, len(audio_data))
         else:
             # 沒有檢測到靜音段，使用一般的低通濾波器
             cutoff = 0.1  # 截止頻率為0.1*fs/2
             b, a = signal.butter(8, cutoff, 'lowpass')
-            denoised_audio = signal.filtfilt(b, a, audio_data)
+            denoised_audio = signal.filtfilt(b, a, audio_data).astype(np.float32)
         
         return denoised_audio
 
@@ -114,87 +237,96 @@ class NoiseReducer:
         返回值:
             denoised_audio: 降噪後的音頻
         """
-        # 使用小波分解
-        coeffs = signal.cwt(audio_data, signal.ricker, np.arange(1, 31))
-        
-        # 計算閾值
-        threshold = self.wavelet_threshold_mult * np.median(np.abs(coeffs)) / 0.6745
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
         
-        # 應用閾值
-        coeffs_thresholded = coeffs * (np.abs(coeffs) > threshold)
-        
-        # 重建信號
-        denoised_audio = np.mean(coeffs_thresholded, axis=0)
+        # 離散小波分解
+        wavelet = 'db8'
+        level = min(6, pywt.dwt_max_level(len(audio_data), pywt.Wavelet(wavelet).dec_len))
+        coeffs = pywt.wavedec(audio_data, wavelet, level=level, mode='periodization')
         
-        # 正規化
-        if np.max(np.abs(denoised_audio)) > 0:
-            denoised_audio = denoised_audio / np.max(np.abs(denoised_audio))
+        # 由最細尺度係數估計噪聲標準差，計算通用閾值
+        sigma = np.median(np.abs(coeffs[-1])) / 0.6745
+        threshold = self.wavelet_threshold_mult * sigma * np.sqrt(2 * np.log(len(audio_data)))
         
-        # 保持原始能量
-        orig_energy = np.sqrt(np.mean(audio_data**2))
-        denoised_energy = np.sqrt(np.mean(denoised_audio**2))
+        # 對細節係數應用軟閾值，保留近似係數
+        coeffs[1:] = [pywt.threshold(c, threshold, mode='soft') for c in coeffs[1:]]
         
-        if denoised_energy > 0:
-            denoised_audio = denoised_audio * (orig_energy / denoised_energy)
+        # 重建信號
+        denoised_audio = pywt.waverec(coeffs, wavelet, mode='periodization')[:len(audio_data)].astype(np.float32)
         
         return denoised_audio
 
-    def multi_stage_denoising(self, audio_data):
+    def multi_stage_denoising(self, audio_data, silence_mask=None):
         """
         多階段降噪法，結合頻譜減法和小波處理
         
         參數:
             audio_data: 音頻數據
+            silence_mask: 靜音掩碼 (可選，避免重複檢測)
             
         返回值:
             denoised_audio: 降噪後的音頻
         """
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+        
+        # 靜音檢測只做一次，供頻譜減法和適應性混合共用
+        if silence_mask is None:
+            silence_mask = self.detect_silence(audio_data)
+        
         # 第一階段：標準頻譜降噪
-        stage1_audio = self.reduce_noise_standard(audio_data)
+        stage1_audio = self.reduce_noise_standard(audio_data, silence_mask=silence_mask)
         
         # 第二階段：小波降噪
         stage2_audio = self.reduce_noise_wavelet(stage1_audio)
         
-        # 適應性混合
-        silence_mask = self.detect_silence(audio_data)
-        non_silence_mask = ~silence_mask
-        
-        # 對非靜音部分，更傾向於保留原始信號特徵
-        mixed_audio = np.zeros_like(audio_data)
-        mixed_audio[silence_mask] = stage2_audio[silence_mask] * 0.9  # 靜音部分強降噪
-        mixed_audio[non_silence_mask] = stage2_audio[non_silence_mask] * 0.6 + audio_data[non_silence_mask] * 0.4  # 混合，保留語音特徵
+        # 適應性混合: 靜音部分強降噪 (0.9)，非靜音部分混合原始信號以保留語音特徵 (0.6 / 0.4)
+        # (原地寫入第二階段的輸出緩衝區，避免額外的臨時數組)
+        alpha = np.where(silence_mask, np.float32(0.9), np.float32(0.6))
+        beta = np.where(silence_mask, np.float32(0.0), np.float32(0.4))
+        mixed_audio = stage2_audio
+        np.multiply(mixed_audio, alpha, out=mixed_audio)
+        np.multiply(beta, audio_data, out=beta)
+        np.add(mixed_audio, beta, out=mixed_audio)
         
         return mixed_audio
 
-    def enhanced_multi_stage_denoising(self, audio_data, voice_preserve=True):
+    def enhanced_multi_stage_denoising(self, audio_data, voice_preserve=True, silence_mask=None):
         """
         增強型多階段降噪法，包含增益控制和保護主要語音
         
         參數:
             audio_data: 音頻數據
             voice_preserve: 是否保護語音特徵
+            silence_mask: 靜音掩碼 (可選，避免重複檢測)
             
         返回值:
             denoised_audio: 降噪後的音頻
         """
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+        
+        # 識別語音段 (只檢測一次，與多階段降噪共用)
+        if silence_mask is None:
+            silence_mask = self.detect_silence(audio_data)
+        
         # 基礎降噪
-        denoised_audio = self.multi_stage_denoising(audio_data)
+        denoised_audio = self.multi_stage_denoising(audio_data, silence_mask=silence_mask)
         
         if voice_preserve:
-            # 識別語音段
-            silence_mask = self.detect_silence(audio_data)
-            voice_mask = ~silence_mask
-            
-            # 應用不同強度的處理
-            result = np.zeros_like(audio_data)
-            result[silence_mask] = denoised_audio[silence_mask] * 0.9  # 靜音部分強降噪
-            
-            # 保護語音段，混合原始音頻和降噪結果
-            result[voice_mask] = denoised_audio[voice_mask] * 0.7 + audio_data[voice_mask] * 0.3
+            # 靜音部分強降噪 (0.9)，語音段混合原始音頻和降噪結果 (0.7 / 0.3)
+            alpha = np.where(silence_mask, np.float32(0.9), np.float32(0.7))
+            beta = np.where(silence_mask, np.float32(0.0), np.float32(0.3))
+            result = denoised_audio
+            np.multiply(result, alpha, out=result)
+            np.multiply(beta, audio_data, out=beta)
+            np.add(result, beta, out=result)
             
-            # 平滑過渡
+            # 平滑過渡 (以累積和計算移動平均，等同零填充的 np.convolve mode='same')
             window_size = int(0.01 * self.sample_rate)  # 10ms
-            result = np.convolve(result, np.ones(window_size)/window_size, mode='same')
+            padded = np.pad(result, (window_size // 2, (window_size - 1) // 2))
+            c = np.empty(len(padded) + 1, dtype=np.float64)
+            c[0] = 0.0
+            np.cumsum(padded, dtype=np.float64, out=c[1:])
+            np.divide(c[window_size:] - c[:-window_size], window_size, out=result, casting='same_kind')
             
             return result
         else:
@@ -7,23 +7,147 @@
 """
 
 import os
+import sys
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 import librosa
 import soundfile as sf
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tqdm import tqdm
-import matplotlib.pyplot as plt
-import seaborn as sns
 import warnings
 
 # 導入自定義模塊
 from src.core.noise_reducer import NoiseReducer
 from src.core.evaluator import AudioEvaluator
+from src.core._kernels import audio_stats, compute_improvements, frame_energy, limit_threads
+from src.utils.data_manager import _CSV_KW, write_parquet_sidecar
+from src.utils.visualization import DEFAULT_PLOT_DPI
 
 # 忽略警告
 warnings.filterwarnings("ignore")
 
+# 單個文件分析結果的列 (與 _build_result 生成的鍵順序一致)
+_METRIC_KEYS = ('rms', 'rms_db', 'peak', 'peak_db', 'cv', 'snr', 'non_speech_ratio', 'max_silence')
+RESULT_COLUMNS = (
+    ('filename', 'original_compliant', 'processed_compliant')
+    + tuple(f'original_{k}' for k in _METRIC_KEYS)
+    + tuple(f'processed_{k}' for k in _METRIC_KEYS)
+    + ('rms_improvement', 'peak_improvement', 'snr_improvement', 'cv_improvement')
+)
+
+# 工作進程中的實驗實例 (由 _init_worker 建立)
+_worker_experiment = None
+
+def _init_worker(config):
+    """工作進程初始化: 限制 Numba 並行核心的線程數並建立進程內的實驗實例"""
+    global _worker_experiment
+    limit_threads(1)
+    _worker_experiment = NoiseReductionExperiment(config)
+
+def _process_one_file(task):
+    """工作進程任務: 處理並分析單個音頻文件"""
+    audio_file, method, output_file = task
+    return _worker_experiment.process_and_analyze(audio_file, method, output_file)
+
+def _compare_one_file(task):
+    """工作進程任務: 以所有比較方法依序處理並分析單個音頻文件"""
+    audio_file, method_outputs = task
+    return _worker_experiment.compare_file(audio_file, method_outputs)
+
+def _plotting():
+    """
+    延遲導入繪圖庫 (只在生成圖表時需要，工作進程啟動時不載入)
+    
+    pyplot 尚未被導入時使用非交互式的 Agg 後端，跳過 GUI 後端探測。
+    
+    返回值:
+        (plt, sns): matplotlib.pyplot 和 seaborn 模塊
+    """
+    if 'matplotlib.pyplot' not in sys.modules:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+def find_audio_files(input_dir):
+    """
+    單次掃描目錄，找出其中的音頻文件 (.wav/.mp3，不區分大小寫，跳過隱藏文件)
+    
+    參數:
+        input_dir: 輸入目錄
+        
+    返回值:
+        audio_files: 音頻文件路徑列表，目錄不存在時為空列表
+    """
+    if not os.path.isdir(input_dir):
+        return []
+    with os.scandir(input_dir) as it:
+        return [
+            Path(entry.path) for entry in it
+            if entry.is_file() and not entry.name.startswith('.')
+            and entry.name.lower().endswith(('.wav', '.mp3'))
+        ]
+
+def _fast_load(path):
+    """
+    讀取音頻文件 (保持原始採樣率，多聲道時混合為單聲道)
+    
+    優先使用 soundfile 直接解碼 WAV/FLAC 等格式，soundfile 無法讀取時才退回 librosa.load。
+    
+    參數:
+        path: 音頻文件路徑
+        
+    返回值:
+        audio_data: float32 音頻數據
+        sr: 採樣率
+    """
+    try:
+        audio_data, sr = sf.read(path, dtype='float32', always_2d=False)
+    except RuntimeError:
+        return librosa.load(path, sr=None)
+    
+    if audio_data.ndim == 2:
+        audio_data = audio_data.mean(axis=1)
+    
+    return audio_data, sr
+
+class _StreamStats:
+    """分塊累加音頻的歸約統計量和幀能量 (供流式處理後評估)"""
+    
+    def __init__(self, sr):
+        self.frame_length = int(0.02 * sr)  # 20ms
+        self.hop_length = int(0.01 * sr)    # 10ms
+        self.n = 0
+        self.total = 0.0
+        self.sumsq = 0.0
+        self.maxabs = 0.0
+        self.sumabs = 0.0
+        self.energies = []
+    
+    def update(self, block):
+        """累加一個音頻塊"""
+        total, sumsq, maxabs, sumabs = audio_stats(block)
+        self.n += len(block)
+        self.total += total
+        self.sumsq += sumsq
+        self.maxabs = max(self.maxabs, maxabs)
+        self.sumabs += sumabs
+        self.energies.append(frame_energy(block, self.frame_length, self.hop_length))
+    
+    def as_dict(self):
+        """返回 AudioEvaluator.evaluate_stats 使用的統計量字典"""
+        return {
+            'n': self.n,
+            'sum': self.total,
+            'sumsq': self.sumsq,
+            'maxabs': self.maxabs,
+            'sumabs': self.sumabs,
+            'frame_energy': np.concatenate(self.energies) if self.energies else np.zeros(0)
+        }
+
 class NoiseReductionExperiment:
     """降噪實驗運行器"""
     
@@ -36,7 +160,12 @@ class NoiseReductionExperiment:
             'temp_dir': 'temp',
             'methods': ['standard', 'wavelet', 'multi_stage', 'enhanced_multi_stage'],
             'selected_method': 'enhanced_multi_stage',
-            'create_plots': True
+            'create_plots': True,
+            'max_workers': os.cpu_count() or 1,
+            'stft_backend': 'librosa',
+            'audio_cache_bytes': 256 * 2**20,  # 每個進程的已解碼音頻緩存上限 (字節)
+            'streaming_threshold_s': 600,  # 超過此時長 (秒) 的文件分塊流式處理
+            'plot_dpi': DEFAULT_PLOT_DPI    # 圖表解析度 (發佈用圖表可設為 300)
         }
         
         # 更新配置
@@ -49,11 +178,78 @@ class NoiseReductionExperiment:
         
         # 初始化評估器和降噪器
         self.evaluator = AudioEvaluator()
-        self.noise_reducer = NoiseReducer()
+        self.noise_reducer = NoiseReducer(stft_backend=self.config['stft_backend'])
         
         # 儲存結果
         self.results = []
         self.comparison_results = {}
+        
+        # 寫出處理後音頻的後台線程池 (寫文件與評估重疊進行)
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        
+        # 已解碼音頻的緩存 {(路徑, 修改時間): {'audio', 'sr', 'silence_mask', 'evaluation'}}，按最近使用排序
+        self._audio_cache = OrderedDict()
+        self._audio_cache_nbytes = 0
+    
+    def close(self):
+        """等待後台寫入完成並關閉線程池 (未完成的寫入錯誤在此處拋出)"""
+        self._io_pool.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _load_audio(self, audio_file):
+        """
+        讀取音頻並緩存解碼結果
+        
+        以 (路徑, 修改時間) 為鍵，文件被改寫後自動失效；比較多種方法時同一文件只需解碼一次，
+        靜音掩碼和原始音頻的評估結果也在第一次需要時計算並隨緩存項保存。
+        緩存按音頻數據的字節數限制大小 (每個工作進程各有一份)，至少保留最近使用的一項。
+        
+        參數:
+            audio_file: 音頻文件路徑
+            
+        返回值:
+            entry: 緩存項字典 {'audio': 音頻數據 (各方法共用，不可原地修改), 'sr': 採樣率,
+                   'silence_mask': 靜音掩碼或None, 'evaluation': (評估指標, 是否符合標準) 或None}
+        """
+        path = os.fspath(audio_file)
+        key = (path, os.stat(path).st_mtime_ns)
+        
+        entry = self._audio_cache.get(key)
+        if entry is not None:
+            self._audio_cache.move_to_end(key)
+            return entry
+        
+        audio_data, sr = _fast_load(path)
+        entry = {'audio': audio_data, 'sr': sr, 'silence_mask': None, 'evaluation': None}
+        
+        self._audio_cache[key] = entry
+        self._audio_cache_nbytes += audio_data.nbytes
+        while self._audio_cache_nbytes > self.config['audio_cache_bytes'] and len(self._audio_cache) > 1:
+            _, evicted = self._audio_cache.popitem(last=False)
+            self._audio_cache_nbytes -= evicted['audio'].nbytes
+        
+        return entry
+    
+    def _evaluate_original(self, audio_file):
+        """
+        評估原始音頻 (結果隨音頻緩存項保存，比較多種方法時每個文件只評估一次)
+        
+        參數:
+            audio_file: 原始音頻文件路徑
+            
+        返回值:
+            metrics: 評估指標字典 (共用，不可修改)
+            compliant: 是否符合標準
+        """
+        entry = self._load_audio(audio_file)
+        if entry['evaluation'] is None:
+            entry['evaluation'] = self.evaluator.evaluate_audio(entry['audio'], entry['sr'])
+        return entry['evaluation']
     
     def process_file(self, audio_file, method='enhanced_multi_stage'):
         """
@@ -64,29 +260,112 @@ class NoiseReductionExperiment:
             method: 降噪方法
             
         返回值:
+            audio_data: 原始音頻 (已解碼，供分析時直接使用)
             processed_audio: 處理後的音頻
             sr: 採樣率
         """
-        # 讀取音頻
-        audio_data, sr = librosa.load(audio_file, sr=None)
+        # 讀取音頻 (使用緩存)
+        entry = self._load_audio(audio_file)
+        audio_data, sr = entry['audio'], entry['sr']
         
         # 設置降噪器採樣率
         self.noise_reducer.sample_rate = sr
         
+        # 靜音掩碼在各方法之間共用 (小波方法不需要)
+        if method != 'wavelet' and entry['silence_mask'] is None:
+            entry['silence_mask'] = self.noise_reducer.detect_silence(audio_data)
+        silence_mask = entry['silence_mask']
+        
         # 應用選擇的降噪方法
+        processed_audio = self._denoise(audio_data, method, silence_mask)
+        
+        return audio_data, processed_audio, sr
+    
+    def _denoise(self, audio_data, method, silence_mask=None):
+        """
+        對音頻數據應用指定的降噪方法
+        
+        參數:
+            audio_data: 音頻數據
+            method: 降噪方法
+            silence_mask: 靜音掩碼 (可選，未提供時由各方法自行檢測)
+            
+        返回值:
+            processed_audio: 處理後的音頻
+        """
         if method == 'standard':
-            processed_audio = self.noise_reducer.reduce_noise_standard(audio_data)
+            return self.noise_reducer.reduce_noise_standard(audio_data, silence_mask=silence_mask)
         elif method == 'wavelet':
-            processed_audio = self.noise_reducer.reduce_noise_wavelet(audio_data)
+            return self.noise_reducer.reduce_noise_wavelet(audio_data)
         elif method == 'multi_stage':
-            processed_audio = self.noise_reducer.multi_stage_denoising(audio_data)
+            return self.noise_reducer.multi_stage_denoising(audio_data, silence_mask=silence_mask)
         elif method == 'enhanced_multi_stage':
-            processed_audio = self.noise_reducer.enhanced_multi_stage_denoising(audio_data)
+            return self.noise_reducer.enhanced_multi_stage_denoising(audio_data, silence_mask=silence_mask)
         else:
             print(f"未知方法: {method}, 使用預設方法 enhanced_multi_stage")
-            processed_audio = self.noise_reducer.enhanced_multi_stage_denoising(audio_data)
+            return self.noise_reducer.enhanced_multi_stage_denoising(audio_data, silence_mask=silence_mask)
+    
+    def process_file_streaming(self, audio_file, method, output_file, block_s=30, overlap_s=1):
+        """
+        分塊流式處理長音頻文件，內存佔用與文件時長無關
         
-        return processed_audio, sr
+        每塊前後各多讀 overlap_s / 2 秒，降噪後只寫出塊的中間部分，避免塊邊界的失真；
+        同時累加原始和處理後音頻的統計量，評估時不需要再次讀取整個文件。
+        
+        參數:
+            audio_file: 音頻文件路徑
+            method: 降噪方法
+            output_file: 處理後音頻的保存路徑
+            block_s: 每塊時長 (秒)
+            overlap_s: 相鄰塊的重疊時長 (秒)
+            
+        返回值:
+            original_stats: 原始音頻的統計量字典
+            processed_stats: 處理後音頻的統計量字典
+            sr: 採樣率
+        """
+        with sf.SoundFile(audio_file) as fin:
+            sr = fin.samplerate
+            n = fin.frames
+            block = int(block_s * sr)
+            overlap = int(overlap_s * sr)
+            step = block - overlap
+            
+            self.noise_reducer.sample_rate = sr
+            original_stats = _StreamStats(sr)
+            processed_stats = _StreamStats(sr)
+            
+            with sf.SoundFile(output_file, 'w', samplerate=sr, channels=1) as fout:
+                start = 0
+                while start < n:
+                    # 剩餘部分不足半塊時併入當前塊，避免末尾出現過短的塊
+                    length = block if start + block + step // 2 < n else n - start
+                    last = start + length >= n
+                    
+                    fin.seek(start)
+                    audio_data = fin.read(length, dtype='float32', always_2d=True).mean(axis=1)
+                    processed_audio = self._denoise(audio_data, method)
+                    
+                    # 只保留與前後塊不重疊的中間部分
+                    head = 0 if start == 0 else overlap // 2
+                    tail = length if last else length - (overlap - overlap // 2)
+                    
+                    fout.write(processed_audio[head:tail])
+                    original_stats.update(audio_data[head:tail])
+                    processed_stats.update(processed_audio[head:tail])
+                    
+                    if last:
+                        break
+                    start += step
+        
+        return original_stats.as_dict(), processed_stats.as_dict(), sr
+    
+    def _is_long_file(self, audio_file):
+        """判斷文件是否超過流式處理的時長閾值 (無法讀取文件信息時視為否)"""
+        try:
+            return sf.info(audio_file).duration > self.config['streaming_threshold_s']
+        except RuntimeError:
+            return False
     
     def analyze_audio_pair(self, original_file, processed_file):
         """
@@ -99,30 +378,75 @@ class NoiseReductionExperiment:
         返回值:
             result: 分析結果字典
         """
-        # 讀取音頻
-        original_audio, sr = librosa.load(original_file, sr=None)
-        processed_audio, _ = librosa.load(processed_file, sr=sr)
+        # 讀取音頻 (原始音頻使用緩存)
+        entry = self._load_audio(original_file)
+        original_audio, sr = entry['audio'], entry['sr']
+        processed_audio, processed_sr = _fast_load(processed_file)
+        if processed_sr != sr:
+            processed_audio = librosa.resample(processed_audio, orig_sr=processed_sr, target_sr=sr)
+        
+        # 長度一致時可直接使用緩存的原始音頻評估結果
+        original_evaluation = None
+        if len(processed_audio) == len(original_audio):
+            original_evaluation = self._evaluate_original(original_file)
+        
+        return self.analyze_audio_pair_arrays(original_audio, processed_audio, sr,
+                                              os.path.basename(original_file), original_evaluation)
+    
+    def analyze_audio_pair_arrays(self, original_audio, processed_audio, sr, filename, original_evaluation=None):
+        """
+        直接以內存中的音頻數據分析原始音頻和處理後音頻 (不需要重新讀取文件)
         
+        參數:
+            original_audio: 原始音頻數據
+            processed_audio: 處理後音頻數據
+            sr: 採樣率
+            filename: 結果中記錄的文件名
+            original_evaluation: 原始音頻的 (評估指標, 是否符合標準) (可選，兩段音頻長度相同時可傳入緩存結果)
+            
+        返回值:
+            result: 分析結果字典
+        """
         # 確保長度相同
         min_len = min(len(original_audio), len(processed_audio))
         original_audio = original_audio[:min_len]
         processed_audio = processed_audio[:min_len]
         
-        # 獲取文件名
-        filename = os.path.basename(original_file)
-        
         # 評估原始音頻
-        original_metrics, original_compliant = self.evaluator.evaluate_audio(original_audio, sr)
+        if original_evaluation is None:
+            original_evaluation = self.evaluator.evaluate_audio(original_audio, sr)
+        original_metrics, original_compliant = original_evaluation
         
         # 評估處理後音頻
         processed_metrics, processed_compliant = self.evaluator.evaluate_audio(processed_audio, sr)
         
-        # 計算改善程度
+        return self._build_result(filename, original_metrics, original_compliant,
+                                  processed_metrics, processed_compliant)
+    
+    def _build_result(self, filename, original_metrics, original_compliant,
+                      processed_metrics, processed_compliant):
+        """
+        計算改善程度並合併為單個文件的分析結果
+        
+        參數:
+            filename: 文件名
+            original_metrics, original_compliant: 原始音頻的評估指標和是否符合標準
+            processed_metrics, processed_compliant: 處理後音頻的評估指標和是否符合標準
+            
+        返回值:
+            result: 分析結果字典
+        """
+        # 計算改善程度 (由編譯核心一次算出，原始值為0時百分比記為0)
+        rms_imp, peak_imp, snr_imp, cv_imp = compute_improvements(
+            original_metrics['rms'], original_metrics['peak'], original_metrics['snr'], original_metrics['cv'],
+            processed_metrics['rms'], processed_metrics['peak'], processed_metrics['snr'], processed_metrics['cv']
+        )
+        
         improvements = {
-            'rms_improvement': ((processed_metrics['rms'] - original_metrics['rms']) / original_metrics['rms']) * 100 if original_metrics['rms'] > 0 else 0,
-            'peak_improvement': ((processed_metrics['peak'] - original_metrics['peak']) / original_metrics['peak']) * 100 if original_metrics['peak'] > 0 else 0,
-            'snr_improvement': processed_metrics['snr'] - original_metrics['snr'],
-            'cv_improvement': ((processed_metrics['cv'] - original_metrics['cv']) / original_metrics['cv']) * 100 if original_metrics['cv'] > 0 else 0
+            'rms_improvement': rms_imp,
+            'peak_improvement': peak_imp,
+            'snr_improvement': snr_imp,
+            'cv_improvement': cv_imp
         }
         
         # 合併結果
@@ -163,9 +487,7 @@ class NoiseReductionExperiment:
         method = self.config['selected_method']
         
         # 找到所有音頻文件
-        audio_files = []
-        for ext in ['.wav', '.mp3']:
-            audio_files.extend(list(input_dir.glob(f'*{ext}')))
+        audio_files = find_audio_files(input_dir)
         
         if not audio_files:
             print(f"在 {input_dir} 中未找到音頻文件")
@@ -176,32 +498,23 @@ class NoiseReductionExperiment:
         # 清空結果
         self.results = []
         
-        # 處理每個文件
-        for audio_file in tqdm(audio_files):
-            try:
-                # 處理音頻
-                processed_audio, sr = self.process_file(audio_file, method)
-                
-                # 設置輸出文件路徑
-                output_file = output_dir / f"processed_{audio_file.name}"
-                
-                # 保存處理後的音頻
-                sf.write(output_file, processed_audio, sr)
-                
-                # 分析結果
-                result = self.analyze_audio_pair(audio_file, output_file)
-                self.results.append(result)
-                
-            except Exception as e:
-                print(f"處理文件 {audio_file} 時出錯: {str(e)}")
+        # 處理每個文件 (文件之間相互獨立，使用進程池並行處理)
+        tasks = [(audio_file, method, output_dir / f"processed_{audio_file.name}") for audio_file in audio_files]
+        executor = self._create_executor(len(tasks))
+        try:
+            self.results = self._map_files(tasks, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
         
         # 創建結果DataFrame
         if self.results:
-            results_df = pd.DataFrame(self.results)
+            results_df = pd.DataFrame.from_records(self.results, columns=RESULT_COLUMNS)
             
             # 保存結果
             csv_file = output_dir / f"noise_reduction_{method}_results.csv"
-            results_df.to_csv(csv_file, index=False)
+            results_df.to_csv(csv_file, **_CSV_KW)
+            write_parquet_sidecar(results_df, csv_file)
             
             # 生成可視化
             if self.config['create_plots']:
@@ -212,6 +525,109 @@ class NoiseReductionExperiment:
             print("沒有得到任何結果")
             return None
     
+    def process_and_analyze(self, audio_file, method, output_file):
+        """
+        處理單個音頻文件，保存結果並分析
+        
+        參數:
+            audio_file: 音頻文件路徑
+            method: 降噪方法
+            output_file: 處理後音頻的保存路徑
+            
+        返回值:
+            result: 分析結果字典，處理失敗時為 None
+        """
+        try:
+            # 長文件分塊流式處理，以累加的統計量評估
+            if self._is_long_file(audio_file):
+                original_stats, processed_stats, sr = self.process_file_streaming(audio_file, method, output_file)
+                original_metrics, original_compliant = self.evaluator.evaluate_stats(original_stats, sr)
+                processed_metrics, processed_compliant = self.evaluator.evaluate_stats(processed_stats, sr)
+                return self._build_result(os.path.basename(audio_file), original_metrics, original_compliant,
+                                          processed_metrics, processed_compliant)
+            
+            # 處理音頻
+            audio_data, processed_audio, sr = self.process_file(audio_file, method)
+            
+            # 在後台線程保存處理後的音頻 (僅作存檔，分析直接使用內存中的數據)
+            write_future = self._io_pool.submit(sf.write, output_file, processed_audio, sr)
+            
+            try:
+                # 分析結果 (原始音頻的評估結果在各方法之間共用)
+                result = self.analyze_audio_pair_arrays(audio_data, processed_audio, sr,
+                                                        os.path.basename(audio_file),
+                                                        self._evaluate_original(audio_file))
+            finally:
+                # 返回或出錯前確保文件已寫出 (寫入錯誤也在此處拋出)
+                write_future.result()
+            return result
+            
+        except Exception as e:
+            print(f"處理文件 {audio_file} 時出錯: {str(e)}")
+            return None
+    
+    def compare_file(self, audio_file, method_outputs):
+        """
+        以多種方法依序處理並分析同一個音頻文件 (解碼、靜音檢測和原始音頻評估只做一次)
+        
+        參數:
+            audio_file: 音頻文件路徑
+            method_outputs: (方法, 輸出路徑) 列表
+            
+        返回值:
+            results: 與 method_outputs 順序一致的分析結果列表，處理失敗的項為 None
+        """
+        return [self.process_and_analyze(audio_file, method, output_file)
+                for method, output_file in method_outputs]
+    
+    def _create_executor(self, n_files):
+        """
+        按配置建立處理文件的進程池
+        
+        參數:
+            n_files: 待處理的文件數
+            
+        返回值:
+            executor: 進程池，不需要並行 (max_workers <= 1 或只有一個文件) 時為 None
+        """
+        max_workers = self.config['max_workers']
+        if not max_workers or max_workers <= 1 or n_files <= 1:
+            return None
+        
+        return ProcessPoolExecutor(max_workers=min(max_workers, n_files), initializer=_init_worker,
+                                   initargs=(self.config,))
+    
+    def _map_files(self, tasks, executor=None, compare=False):
+        """
+        對 (音頻文件, 方法, 輸出路徑) 任務列表執行處理和分析
+        
+        參數:
+            tasks: 任務列表 (compare 為 True 時為 (音頻文件, [(方法, 輸出路徑), ...]) 列表)
+            executor: 進程池 (可選，未提供時在當前進程中依序執行)
+            compare: 是否以 compare_file 在同一個進程中對每個文件依序執行所有方法
+            
+        返回值:
+            results: 成功的分析結果列表 (compare 為 True 時為每個文件的結果列表)
+        """
+        if compare:
+            local_fn, worker_fn = self.compare_file, _compare_one_file
+        else:
+            local_fn, worker_fn = self.process_and_analyze, _process_one_file
+        
+        # 降低進度條刷新頻率，文件處理很快時避免終端輸出成為瓶頸
+        progress = dict(total=len(tasks), mininterval=0.5, smoothing=0.1,
+                        miniters=max(1, len(tasks) // 100))
+        
+        if executor is None:
+            results = [local_fn(*task) for task in tqdm(tasks, **progress)]
+        else:
+            # 每個工作進程大約分到四批任務，減少進程間通訊的往返次數
+            workers = max(1, min(self.config['max_workers'], len(tasks)))
+            chunksize = max(1, len(tasks) // (4 * workers))
+            results = list(tqdm(executor.map(worker_fn, tasks, chunksize=chunksize), **progress))
+        
+        return [r for r in results if r is not None]
+    
     def compare_methods(self, input_files, output_dir=None):
         """
         比較不同降噪方法
@@ -238,65 +654,77 @@ class NoiseReductionExperiment:
             'compliance_rate': []
         }
         
-        # 對每種方法運行實驗
-        for method in self.config['methods']:
-            print(f"\n=== 方法: {method} ===")
-            
-            method_results = []
-            compliance_count = 0
-            
-            # 對每個文件運行降噪
-            for audio_file in tqdm(input_files):
-                try:
-                    # 處理音頻
-                    processed_audio, sr = self.process_file(audio_file, method)
-                    
-                    # 設置臨時輸出文件
-                    temp_file = Path(self.config['temp_dir']) / f"{method}_{Path(audio_file).name}"
-                    
-                    # 保存處理後的音頻
-                    sf.write(temp_file, processed_audio, sr)
-                    
-                    # 分析結果
-                    result = self.analyze_audio_pair(audio_file, temp_file)
-                    method_results.append(result)
-                    
-                    # 計算符合標準的數量
-                    if result['processed_compliant']:
-                        compliance_count += 1
-                        
-                except Exception as e:
-                    print(f"處理文件 {audio_file} 時出錯: {str(e)}")
+        # 文件之間相互獨立，使用進程池並行處理；同一個文件的所有方法在同一個進程中依序執行，
+        # 解碼後的音頻、靜音掩碼和原始音頻評估結果在各方法之間共用
+        methods = self.config['methods']
+        temp_dir = Path(self.config['temp_dir'])
+        tasks = [
+            (audio_file, [(method, temp_dir / f"{method}_{Path(audio_file).name}") for method in methods])
+            for audio_file in input_files
+        ]
+        
+        executor = self._create_executor(len(input_files))
+        try:
+            print(f"\n=== 比較方法: {', '.join(methods)} ===")
+            file_results = self._map_files(tasks, executor, compare=True)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        # 按方法匯總結果
+        for i, method in enumerate(methods):
+            method_results = [results[i] for results in file_results if results[i] is not None]
             
             # 如果有結果
             if method_results:
-                # 計算平均改善
-                avg_snr_improvement = np.mean([r['snr_improvement'] for r in method_results])
-                avg_cv_improvement = np.mean([r['cv_improvement'] for r in method_results])
-                avg_rms_improvement = np.mean([r['rms_improvement'] for r in method_results])
-                avg_peak_improvement = np.mean([r['peak_improvement'] for r in method_results])
-                compliance_rate = compliance_count / len(method_results)
+                # 一次向量化歸約計算平均改善和符合標準率
+                mdf = pd.DataFrame.from_records(method_results, columns=RESULT_COLUMNS)
+                means = mdf[['snr_improvement', 'cv_improvement', 'rms_improvement',
+                             'peak_improvement', 'processed_compliant']].astype(np.float64).mean()
                 
                 # 添加到比較結果
                 comparison_results['method'].append(method)
-                comparison_results['avg_snr_improvement'].append(avg_snr_improvement)
-                comparison_results['avg_cv_improvement'].append(avg_cv_improvement)
-                comparison_results['avg_rms_improvement'].append(avg_rms_improvement)
-                comparison_results['avg_peak_improvement'].append(avg_peak_improvement)
-                comparison_results['compliance_rate'].append(compliance_rate)
+                comparison_results['avg_snr_improvement'].append(means['snr_improvement'])
+                comparison_results['avg_cv_improvement'].append(means['cv_improvement'])
+                comparison_results['avg_rms_improvement'].append(means['rms_improvement'])
+                comparison_results['avg_peak_improvement'].append(means['peak_improvement'])
+                comparison_results['compliance_rate'].append(means['processed_compliant'])
         
         # 創建比較DataFrame
-        comparison_df = pd.DataFrame(comparison_results)
+        comparison_df = pd.DataFrame({
+            k: (v if k == 'method' else np.asarray(v, dtype=np.float64))
+            for k, v in comparison_results.items()
+        })
         
         # 保存結果
         csv_file = output_dir / "method_comparison_results.csv"
-        comparison_df.to_csv(csv_file, index=False)
+        comparison_df.to_csv(csv_file, **_CSV_KW)
         
         # 創建比較可視化
         self.create_comparison_visualizations(comparison_df, output_dir)
         
         return comparison_df
     
+    def _save_figure(self, fig, path):
+        """
+        以配置的解析度保存圖表：在主線程渲染 (matplotlib 的繪圖狀態不是線程安全的)，
+        後台線程只負責 PNG 編碼和寫入，與下一張圖表的繪製重疊進行
+        
+        參數:
+            fig: matplotlib 圖表
+            path: 保存路徑
+            
+        返回值:
+            future: 保存任務的 Future
+        """
+        plt, _ = _plotting()
+        dpi = self.config['plot_dpi']
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        pixels = np.array(fig.canvas.buffer_rgba())
+        plt.close(fig)
+        return self._io_pool.submit(plt.imsave, path, pixels, dpi=dpi)
+    
     def create_comparison_visualizations(self, comparison_df, output_dir):
         """
         創建方法比較可視化
@@ -305,26 +733,31 @@ class NoiseReductionExperiment:
             comparison_df: 比較結果DataFrame
             output_dir: 輸出目錄
         """
+        plt, sns = _plotting()
         output_dir = Path(output_dir)
         os.makedirs(output_dir, exist_ok=True)
-        
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='method', y='avg_snr_improvement', data=comparison_df)
-        plt.title('不同方法的平均信噪比改善')
-        plt.ylabel('信噪比改善 (dB)')
-        plt.xlabel('降噪方法')
-        plt.tight_layout()
-        plt.savefig(output_dir / 'methods_snr_comparison.png', dpi=300)
-        plt.close()
-        
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='method', y='compliance_rate', data=comparison_df)
-        plt.title('不同方法的符合標準率')
-        plt.ylabel('符合標準率')
-        plt.xlabel('降噪方法')
-        plt.tight_layout()
-        plt.savefig(output_dir / 'methods_compliance_comparison.png', dpi=300)
-        plt.close()
+        futures = []
+        
+        try:
+            fig = plt.figure(figsize=(10, 6))
+            sns.barplot(x='method', y='avg_snr_improvement', data=comparison_df)
+            plt.title('不同方法的平均信噪比改善')
+            plt.ylabel('信噪比改善 (dB)')
+            plt.xlabel('降噪方法')
+            plt.tight_layout()
+            futures.append(self._save_figure(fig, output_dir / 'methods_snr_comparison.png'))
+            
+            fig = plt.figure(figsize=(10, 6))
+            sns.barplot(x='method', y='compliance_rate', data=comparison_df)
+            plt.title('不同方法的符合標準率')
+            plt.ylabel('符合標準率')
+            plt.xlabel('降噪方法')
+            plt.tight_layout()
+            futures.append(self._save_figure(fig, output_dir / 'methods_compliance_comparison.png'))
+        finally:
+            # 等待所有圖表寫出 (出錯時也不遺漏已提交的寫入)
+            for future in futures:
+                future.result()
     
     def create_visualizations(self, results_df, output_dir, method):
         """
@@ -335,28 +768,33 @@ class NoiseReductionExperiment:
             output_dir: 輸出目錄
             method: 降噪方法
         """
+        plt, _ = _plotting()
         output_dir = Path(output_dir)
         os.makedirs(output_dir, exist_ok=True)
-        
-        # 繪製SNR改善
-        plt.figure(figsize=(10, 6))
-        plt.bar(range(len(results_df)), results_df['snr_improvement'])
-        plt.axhline(y=0, color='r', linestyle='-')
-        plt.title(f'{method} 方法的信噪比改善')
-        plt.ylabel('信噪比改善 (dB)')
-        plt.xlabel('音頻文件')
-        plt.tight_layout()
-        plt.savefig(output_dir / f'{method}_snr_improvement.png', dpi=300)
-        plt.close()
-        
-        # 繪製SNR對比圖
-        plt.figure(figsize=(10, 6))
-        plt.scatter(results_df['original_snr'], results_df['processed_snr'])
-        plt.plot([0, 40], [0, 40], 'r--')  # 對角線
-        plt.title(f'{method} 方法前後信噪比對比')
-        plt.xlabel('原始SNR (dB)')
-        plt.ylabel('處理後SNR (dB)')
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(output_dir / f'{method}_snr_comparison.png', dpi=300)
-        plt.close()
\ No newline at end of file
+        futures = []
+        
+        try:
+            # 繪製SNR改善
+            fig = plt.figure(figsize=(10, 6))
+            plt.bar(range(len(results_df)), results_df['snr_improvement'])
+            plt.axhline(y=0, color='r', linestyle='-')
+            plt.title(f'{method} 方法的信噪比改善')
+            plt.ylabel('信噪比改善 (dB)')
+            plt.xlabel('音頻文件')
+            plt.tight_layout()
+            futures.append(self._save_figure(fig, output_dir / f'{method}_snr_improvement.png'))
+            
+            # 繪製SNR對比圖
+            fig = plt.figure(figsize=(10, 6))
+            plt.scatter(results_df['original_snr'], results_df['processed_snr'])
+            plt.plot([0, 40], [0, 40], 'r--')  # 對角線
+            plt.title(f'{method} 方法前後信噪比對比')
+            plt.xlabel('原始SNR (dB)')
+            plt.ylabel('處理後SNR (dB)')
+            plt.grid(True)
+            plt.tight_layout()
+            futures.append(self._save_figure(fig, output_dir / f'{method}_snr_comparison.png'))
+        finally:
+            # 等待所有圖表寫出 (出錯時也不遺漏已提交的寫入)
+            for future in futures:
+                future.result()
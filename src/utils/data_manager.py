@@ -7,12 +7,118 @@
 """
 
 import os
+import re
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
 import glob
-from datetime import datetime
+import hashlib
+from dateutil.tz import tzlocal
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# 導出 CSV 的共用參數 (浮點數保留6位有效數字，縮小文件大小)
+_CSV_SIG_DIGITS = 6
+_CSV_KW = dict(index=False, float_format=f'%.{_CSV_SIG_DIGITS}g')
+
+# 方法結果文件名 noise_reduction_<方法>_results.csv
+_METHOD_RE = re.compile(r'^noise_reduction_(?P<method>.+)_results\.csv$')
+
+def _round_significant(values, digits=_CSV_SIG_DIGITS):
+    """
+    把浮點數組向量化地舍入到指定的有效數字位數 (零和非有限值保持不變)
+    
+    參數:
+        values: 浮點數組
+        digits: 有效數字位數
+        
+    返回值:
+        rounded: 舍入後的 float64 數組
+    """
+    v = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(v) & (v != 0)
+    magnitude = np.floor(np.log10(np.abs(v, out=np.ones_like(v), where=finite)))
+    decimals = (digits - 1) - magnitude
+    
+    # 以 10 的整數次冪縮放後取整，小數位為負時先除後乘，避免 10 的負次冪引入的舍入誤差
+    # (次正規數的縮放因子溢出，這類值保持不變)
+    with np.errstate(over='ignore', invalid='ignore'):
+        scale = 10.0 ** np.abs(decimals)
+        rounded = np.where(decimals >= 0, np.round(v * scale) / scale, np.round(v / scale) * scale)
+    return np.where(finite & np.isfinite(rounded), rounded, v)
+
+def _round_like_csv(df):
+    """
+    把浮點列舍入到與 _CSV_KW 導出的 CSV 相同的精度 (6位有效數字)
+    
+    parquet 副本與 CSV 保存相同的數值，讀取結果不取決於是否安裝了 pyarrow。
+    
+    參數:
+        df: DataFrame
+        
+    返回值:
+        rounded_df: 浮點列已舍入的副本 (沒有浮點列時為原 DataFrame)
+    """
+    float_cols = df.select_dtypes(include='floating').columns
+    if len(float_cols) == 0:
+        return df
+    rounded_df = df.copy()
+    for col in float_cols:
+        values = rounded_df[col].to_numpy()
+        rounded_df[col] = _round_significant(values).astype(values.dtype, copy=False)
+    return rounded_df
+
+def write_parquet_sidecar(df, csv_path):
+    """
+    在 CSV 文件旁寫出同名的 parquet 副本 (未安裝 pyarrow 時不做任何事)
+    
+    浮點數以與 CSV 相同的精度保存。
+    
+    參數:
+        df: 要保存的 DataFrame
+        csv_path: 對應的 CSV 文件路徑
+    """
+    if not HAS_PYARROW:
+        return
+    try:
+        _round_like_csv(df).to_parquet(Path(csv_path).with_suffix('.parquet'), engine='pyarrow', compression='zstd', index=False)
+    except Exception as e:
+        print(f"無法保存parquet文件 {csv_path}: {str(e)}")
+
+def _fresh_parquet_sidecar(csv_path):
+    """
+    返回 CSV 文件旁不舊於 CSV 本身的 parquet 副本路徑，沒有可用副本時返回 None
+    
+    參數:
+        csv_path: CSV 文件路徑
+    """
+    if not HAS_PYARROW:
+        return None
+    parquet_path = csv_path.with_suffix('.parquet')
+    try:
+        if parquet_path.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns:
+            return parquet_path
+    except OSError:
+        pass
+    return None
+
+def _local_timestamps(epoch_seconds):
+    """
+    把 Unix 時間戳 (秒) 批量轉換為本地時間 (不帶時區，精確到微秒，與 datetime.fromtimestamp 一致)
+    
+    參數:
+        epoch_seconds: 時間戳數組
+        
+    返回值:
+        timestamps: 本地時間的 DatetimeIndex
+    """
+    utc = pd.to_datetime(np.asarray(epoch_seconds), unit='s', utc=True)
+    return utc.tz_convert(tzlocal()).tz_localize(None).round('us').as_unit('us')
 
 class ExperimentDataManager:
     """實驗數據管理器類"""
@@ -22,6 +128,7 @@ class ExperimentDataManager:
         self.results_dir = Path(results_dir)
         self.data_cache = {}  # 用於緩存已加載的數據
         self.summary_data = None  # 用於存儲匯總數據
+        self._group_cache = None  # 按方法分組的聚合結果 (匯總數據更新時失效)
     
     def set_results_dir(self, results_dir):
         """設置結果目錄"""
@@ -29,6 +136,7 @@ class ExperimentDataManager:
         # 清空緩存
         self.data_cache = {}
         self.summary_data = None
+        self._group_cache = None
     
     def load_result_file(self, file_path):
         """
@@ -50,13 +158,27 @@ class ExperimentDataManager:
         # 檢查文件類型並加載
         if file_path.suffix.lower() == '.csv':
             try:
-                df = pd.read_csv(file_path)
+                # 優先讀取同名的 parquet 副本 (列式二進制格式，不需要解析文本)
+                parquet_path = _fresh_parquet_sidecar(file_path)
+                if parquet_path is not None:
+                    df = pd.read_parquet(parquet_path, engine='pyarrow')
+                else:
+                    df = pd.read_csv(file_path)
                 # 保存到緩存
                 self.data_cache[str(file_path)] = df
                 return df
             except Exception as e:
                 print(f"無法加載CSV文件 {file_path}: {str(e)}")
                 return None
+        elif file_path.suffix.lower() == '.parquet':
+            try:
+                df = pd.read_parquet(file_path)
+                # 保存到緩存
+                self.data_cache[str(file_path)] = df
+                return df
+            except Exception as e:
+                print(f"無法加載parquet文件 {file_path}: {str(e)}")
+                return None
         elif file_path.suffix.lower() == '.json':
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
@@ -108,28 +230,102 @@ class ExperimentDataManager:
         返回值:
             匯總後的 DataFrame
         """
+        # 輸入文件沒有變化時，直接讀取上次保存的合併結果
+        cache_path = self._combined_cache_path(method_pattern)
+        if cache_path is not None and cache_path.exists():
+            try:
+                self.summary_data = pd.read_parquet(cache_path, engine='pyarrow')
+                self._group_cache = None
+                return self.summary_data
+            except Exception as e:
+                print(f"無法讀取合併數據緩存 {cache_path}: {str(e)}")
+        
         # 加載所有方法結果
         method_results = self.load_all_results(method_pattern)
         
         if not method_results:
             return None
         
-        # 提取方法名稱並合併數據
-        all_data = []
-        for filename, df in method_results.items():
-            # 從文件名提取方法名
-            method = filename.replace("noise_reduction_", "").replace("_results.csv", "")
-            df['method'] = method
-            all_data.append(df)
-        
-        # 合併所有數據
+        # 合併所有數據，並記錄每行的來源文件
+        all_data = list(method_results.values())
         if all_data:
             combined_df = pd.concat(all_data, ignore_index=True)
+            source_file = pd.Series(
+                np.repeat(list(method_results.keys()), [len(df) for df in all_data]),
+                index=combined_df.index
+            )
+            
+            # 從文件名提取方法名 (單個預編譯正則，對整列向量化處理)
+            method = source_file.str.extract(_METHOD_RE, expand=False)
+            fallback = source_file.str.replace("noise_reduction_", "", regex=False).str.replace("_results.csv", "", regex=False)
+            combined_df['method'] = method.fillna(fallback)
+            
             self.summary_data = combined_df
+            self._group_cache = None
+            self._save_combined_cache(combined_df, cache_path)
             return combined_df
         else:
             return None
     
+    def _combined_cache_path(self, method_pattern):
+        """
+        根據匹配文件的名稱和修改時間生成合併數據緩存的路徑
+        
+        參數:
+            method_pattern: 方法結果文件匹配模式
+            
+        返回值:
+            緩存文件路徑 (隱藏文件)，未安裝 pyarrow 或沒有匹配文件時為 None
+        """
+        if not HAS_PYARROW:
+            return None
+        
+        try:
+            signature = sorted((f.name, f.stat().st_mtime_ns) for f in self.results_dir.glob(method_pattern))
+        except OSError:
+            return None
+        if not signature:
+            return None
+        
+        digest = hashlib.blake2b(repr((method_pattern, signature)).encode(), digest_size=8).hexdigest()
+        return self.results_dir / f".combined_{digest}.parquet"
+    
+    def _save_combined_cache(self, combined_df, cache_path):
+        """
+        保存合併數據緩存並刪除舊的緩存文件
+        
+        參數:
+            combined_df: 合併後的 DataFrame
+            cache_path: 緩存文件路徑 (None 時不保存)
+        """
+        if cache_path is None:
+            return
+        
+        try:
+            for old_cache in self.results_dir.glob(".combined_*.parquet"):
+                if old_cache != cache_path:
+                    old_cache.unlink()
+            combined_df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+        except Exception as e:
+            print(f"無法保存合併數據緩存 {cache_path}: {str(e)}")
+    
+    def _method_groups(self):
+        """
+        按方法分組，一次計算統計摘要和比較報告需要的所有聚合量 (結果會被緩存)
+        
+        返回值:
+            多層列索引的聚合 DataFrame
+        """
+        if self._group_cache is None:
+            self._group_cache = self.summary_data.groupby('method').agg({
+                'snr_improvement': ['mean', 'std', 'min', 'max'],
+                'cv_improvement': ['mean', 'std', 'min', 'max'],
+                'rms_improvement': ['mean'],
+                'peak_improvement': ['mean'],
+                'processed_compliant': ['mean', 'sum', 'count']
+            })
+        return self._group_cache
+    
     def generate_summary_stats(self):
         """
         生成匯總統計信息
@@ -144,12 +340,8 @@ class ExperimentDataManager:
             print("無法生成統計摘要: 沒有可用的數據")
             return None
         
-        # 按方法分組計算統計量
-        stats = self.summary_data.groupby('method').agg({
-            'snr_improvement': ['mean', 'std', 'min', 'max'],
-            'cv_improvement': ['mean', 'std', 'min', 'max'],
-            'processed_compliant': ['mean', 'sum', 'count']
-        })
+        # 按方法分組計算統計量 (取自共用的分組聚合結果)
+        stats = self._method_groups()[['snr_improvement', 'cv_improvement', 'processed_compliant']].copy()
         
         # 添加合規率
         stats[('processed_compliant', 'rate')] = (
@@ -171,22 +363,23 @@ class ExperimentDataManager:
             return
         
         # 重置列索引為單層
-        stats.columns = [f"{col[0]}_{col[1]}" for col in stats.columns]
+        stats.columns = stats.columns.to_flat_index().map('_'.join)
         stats = stats.reset_index()
         
         # 保存到文件
         output_path = self.results_dir / output_file
-        stats.to_csv(output_path, index=False)
+        stats.to_csv(output_path, **_CSV_KW)
         print(f"摘要統計已保存至 {output_path}")
         
         return output_path
     
-    def export_combined_data(self, output_file="all_experiment_data.csv"):
+    def export_combined_data(self, output_file="all_experiment_data.csv", emit_csv=True):
         """
         導出合併後的所有數據
         
         參數:
             output_file: 輸出文件名
+            emit_csv: 如果為False，只導出 parquet 文件 (未安裝 pyarrow 時仍導出CSV)
         """
         if self.summary_data is None:
             self.aggregate_method_results()
@@ -197,7 +390,11 @@ class ExperimentDataManager:
         
         # 保存到文件
         output_path = self.results_dir / output_file
-        self.summary_data.to_csv(output_path, index=False)
+        write_parquet_sidecar(self.summary_data, output_path)
+        if emit_csv or not HAS_PYARROW:
+            self.summary_data.to_csv(output_path, **_CSV_KW)
+        else:
+            output_path = output_path.with_suffix('.parquet')
         print(f"合併數據已保存至 {output_path}")
         
         return output_path
@@ -219,13 +416,12 @@ class ExperimentDataManager:
             print("無法創建方法比較報告: 沒有可用的數據")
             return None
         
-        # 按方法分組計算關鍵指標
-        report = self.summary_data.groupby('method').agg({
-            'snr_improvement': 'mean',
-            'cv_improvement': 'mean',
-            'rms_improvement': 'mean',
-            'peak_improvement': 'mean',
-            'processed_compliant': 'mean'
+        # 按方法分組計算關鍵指標 (取自共用的分組聚合結果)
+        groups = self._method_groups()
+        report = pd.DataFrame({
+            col: groups[(col, 'mean')]
+            for col in ['snr_improvement', 'cv_improvement', 'rms_improvement',
+                        'peak_improvement', 'processed_compliant']
         }).reset_index()
         
         # 重命名列
@@ -242,7 +438,7 @@ class ExperimentDataManager:
         
         # 保存到文件
         output_path = self.results_dir / output_file
-        report.to_csv(output_path, index=False)
+        report.to_csv(output_path, **_CSV_KW)
         print(f"方法比較報告已保存至 {output_path}")
         
         return report
@@ -254,34 +450,31 @@ class ExperimentDataManager:
         參數:
             output_file: 輸出文件名
         """
-        # 獲取所有結果文件
-        all_files = list(self.results_dir.glob("*.csv"))
-        
-        timeline_data = []
-        for file in all_files:
-            # 獲取文件修改時間
-            mod_time = datetime.fromtimestamp(file.stat().st_mtime)
-            
-            # 提取方法名 (如果適用)
-            method = "unknown"
-            if "noise_reduction_" in file.name and "_results.csv" in file.name:
-                method = file.name.replace("noise_reduction_", "").replace("_results.csv", "")
-            
-            # 添加到數據
-            timeline_data.append({
-                'file': file.name,
-                'method': method,
-                'timestamp': mod_time,
-                'size_kb': file.stat().st_size / 1024
-            })
-        
-        # 創建DataFrame並排序
-        timeline_df = pd.DataFrame(timeline_data)
-        timeline_df = timeline_df.sort_values('timestamp')
+        # 單次掃描結果目錄，每個文件只取一次 stat
+        with os.scandir(self.results_dir) as it:
+            csv_entries = [
+                entry for entry in it
+                if entry.is_file() and not entry.name.startswith('.') and entry.name.endswith('.csv')
+            ]
+        stats = [entry.stat() for entry in csv_entries]
+        
+        # 直接組裝各列數組 (修改時間、大小、方法名)
+        names = [entry.name for entry in csv_entries]
+        mtimes = np.fromiter((st.st_mtime for st in stats), dtype=np.float64, count=len(stats))
+        sizes = np.fromiter((st.st_size for st in stats), dtype=np.float64, count=len(stats))
+        matches = [_METHOD_RE.match(name) for name in names]
+        
+        timeline_df = pd.DataFrame({
+            'file': names,
+            'method': [m.group('method') if m else "unknown" for m in matches],
+            'timestamp': _local_timestamps(mtimes),
+            'size_kb': sizes / 1024
+        })
+        timeline_df = timeline_df.sort_values('timestamp', kind='stable')
         
         # 保存到文件
         output_path = self.results_dir / output_file
-        timeline_df.to_csv(output_path, index=False)
+        timeline_df.to_csv(output_path, **_CSV_KW)
         print(f"實驗時間線已保存至 {output_path}")
         
         return timeline_df
\ No newline at end of file
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件操作工具
+提供文件整理腳本共用的掃描、分類、複製和移動功能
+"""
+
+import os
+import re
+import shutil
+import stat
+
+# CSV文件分類規則 (單次匹配，按順序優先: 標準評估、方法比較、分析結果)
+CSV_CLASSIFIER = re.compile(
+    r'^(?:(?P<standard_evaluation>(?=.*standard)(?=.*noise_reduction))'
+    r'|(?P<method_comparison>(?=.*compar(?:ison|e)))'
+    r'|(?P<analysis_results>(?=.*analysis)))',
+    re.IGNORECASE
+)
+
+def classify_csv(file_name):
+    """
+    根據文件名確定CSV文件的目標子目錄
+    
+    參數:
+        file_name: 文件名
+        
+    返回值:
+        子目錄名稱 (standard_evaluation / method_comparison / analysis_results / raw_data)
+    """
+    m = CSV_CLASSIFIER.match(file_name)
+    return m.lastgroup if m else "raw_data"
+
+def scan_files(directory):
+    """
+    單次掃描目錄中的文件 (跳過隱藏文件，與 glob 行為一致)
+    
+    參數:
+        directory: 要掃描的目錄
+        
+    返回值:
+        生成器，產生 (文件名, 文件路徑, 小寫擴展名)
+    """
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield entry.name, entry.path, os.path.splitext(entry.name)[1].lower()
+
+# 是否支持以目錄文件描述符定位目標文件 (POSIX 平台)
+HAS_DIR_FD = hasattr(os, "O_DIRECTORY") and os.open in os.supports_dir_fd
+
+def open_dir(path):
+    """
+    打開目標目錄，返回目錄文件描述符 (平台不支持時返回 None)
+    
+    參數:
+        path: 目錄路徑
+    """
+    if not HAS_DIR_FD:
+        return None
+    return os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+
+def copy_into(src, name, dir_fd):
+    """
+    把文件複製到已打開的目錄下，保留權限和時間戳 (與 copy2 一致)
+    
+    目標文件相對目錄文件描述符創建，不需要每次重新解析目錄路徑；
+    Linux 上以 os.sendfile 在內核中直接傳輸數據，失敗時退回 copyfileobj。
+    
+    參數:
+        src: 源文件路徑
+        name: 目標文件名
+        dir_fd: 目標目錄的文件描述符
+    """
+    with open(src, 'rb') as s:
+        st = os.fstat(s.fileno())
+        fd = os.open(name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=dir_fd)
+        with open(fd, 'wb') as t:
+            offset = 0
+            if hasattr(os, "sendfile"):
+                try:
+                    while offset < st.st_size:
+                        sent = os.sendfile(t.fileno(), s.fileno(), offset, st.st_size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                except OSError:
+                    pass
+            if offset < st.st_size:
+                s.seek(offset)
+                t.seek(offset)
+                shutil.copyfileobj(s, t, 1 << 20)
+            t.flush()
+            os.fchmod(t.fileno(), stat.S_IMODE(st.st_mode))
+            os.utime(t.fileno(), ns=(st.st_atime_ns, st.st_mtime_ns))
+
+def transfer(src, dst, move=False, dir_fd=None):
+    """
+    複製或移動單個文件
+    
+    移動時優先使用 os.replace (同一文件系統內只是重命名，不複製內容)，
+    跨文件系統失敗時退回複製 + 刪除原文件。
+    
+    參數:
+        src: 源文件路徑
+        dst: 目標文件路徑 (提供 dir_fd 時為目標目錄下的文件名)
+        move: 如果為True，移動文件而不是複製
+        dir_fd: 目標目錄的文件描述符 (可選)
+    """
+    if move:
+        try:
+            os.replace(src, dst, dst_dir_fd=dir_fd)
+            return
+        except OSError:
+            pass
+    if dir_fd is None:
+        shutil.copy2(src, dst)  # 使用copy2保留元數據
+    else:
+        copy_into(src, dst, dir_fd)
+    if move:
+        os.remove(src)
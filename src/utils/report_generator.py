@@ -9,32 +9,178 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 from datetime import datetime
-import jinja2
-import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+import functools
 
 from src.utils.data_manager import ExperimentDataManager
+from src.utils.visualization import DEFAULT_PLOT_DPI, _pyplot, _reuse_figure, _close_figures
+
+# HTML報告模板
+_HTML_TEMPLATE_SRC = """
+<!DOCTYPE html>
+<html lang="zh-TW">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>音頻降噪實驗報告</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; color: #333; }
+        .container { max-width: 1200px; margin: 0 auto; }
+        header { text-align: center; margin-bottom: 30px; }
+        h1 { color: #2c3e50; }
+        h2 { color: #3498db; margin-top: 30px; }
+        .summary { background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px; }
+        .recommendation { background: #e8f4f8; padding: 15px; border-left: 5px solid #3498db; margin: 20px 0; }
+        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        th, td { padding: 12px 15px; text-align: left; border-bottom: 1px solid #ddd; }
+        th { background-color: #f2f2f2; }
+        tr:hover { background-color: #f5f5f5; }
+        .plot-container { text-align: center; margin: 30px 0; }
+        .plot-container img { max-width: 100%; height: auto; border: 1px solid #ddd; border-radius: 4px; }
+        footer { margin-top: 50px; text-align: center; font-size: 0.9em; color: #7f8c8d; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>音頻降噪實驗報告</h1>
+            <p>生成時間: {{ current_time }}</p>
+        </header>
+
+        <section class="summary">
+            <h2>實驗摘要</h2>
+            <p>本報告匯總了多種音頻降噪方法的實驗結果。共測試了 {{ method_count }} 種降噪方法。</p>
+
+            <div class="recommendation">
+                <h3>推薦方法</h3>
+                <p>根據實驗結果，<strong>{{ best_method }}</strong> 是效果最佳的降噪方法，平均SNR改善達 {{ best_snr_improvement }} dB。</p>
+            </div>
+        </section>
+
+        <section>
+            <h2>方法比較</h2>
+            {{ table_html|safe }}
+        </section>
+
+        <section>
+            <h2>視覺化結果</h2>
+
+            <div class="plot-container">
+                <h3>SNR改善比較</h3>
+                <img src="{{ plot_files[0] }}" alt="SNR改善比較">
+            </div>
+
+            <div class="plot-container">
+                <h3>合規率比較</h3>
+                <img src="{{ plot_files[1] }}" alt="合規率比較">
+            </div>
+
+            <div class="plot-container">
+                <h3>多指標性能比較</h3>
+                <img src="{{ plot_files[2] }}" alt="多指標性能比較">
+            </div>
+        </section>
+
+        <footer>
+            <p>© {{ current_year }} 音頻降噪實驗系統 | 報告自動生成</p>
+        </footer>
+    </div>
+</body>
+</html>
+"""
+
+# HTML比較表格的列 (結果列名 -> 表頭) 及各列的數值格式
+_TABLE_COLUMNS = {
+    'method': '方法',
+    'avg_snr_improvement': 'SNR改善 (dB)',
+    'avg_cv_improvement': 'CV改善 (%)',
+    'avg_rms_improvement': 'RMS改善 (%)',
+    'compliance_rate': '合規率',
+}
+_TABLE_FORMATTERS = {
+    'SNR改善 (dB)': '{:.2f}'.format,
+    'CV改善 (%)': '{:.2f}'.format,
+    'RMS改善 (%)': '{:.2f}'.format,
+    '合規率': '{:.1%}'.format,
+}
+
+@functools.lru_cache(maxsize=1)
+def _get_html_template():
+    """
+    編譯HTML報告模板 (每個進程只編譯一次)
+    
+    返回值:
+        已編譯的 jinja2.Template
+    """
+    import jinja2
+    
+    env = jinja2.Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True,
+                             auto_reload=False)
+    return env.from_string(_HTML_TEMPLATE_SRC)
+
+def _append_sheet(wb, sheet_name, df):
+    """
+    把 DataFrame 逐行寫入只寫模式工作簿的新工作表 (不含索引，缺失值寫為空單元格)
+    
+    參數:
+        wb: openpyxl.Workbook(write_only=True)
+        sheet_name: 工作表名稱
+        df: 要寫入的 DataFrame
+    """
+    ws = wb.create_sheet(sheet_name)
+    ws.append([str(col) for col in df.columns])
+    
+    # 按列轉為 Python 原生值 (只有含缺失值的列才需要轉換為 object)，再拉鏈成行元組
+    columns = []
+    for _, col in df.items():
+        if col.hasnans:
+            col = col.astype(object).where(col.notna(), None)
+        columns.append(col.tolist())
+    for row in zip(*columns):
+        ws.append(row)
 
 class ReportGenerator:
     """實驗報告生成器"""
     
-    def __init__(self, results_dir="results", output_dir="reports"):
-        """初始化報告生成器"""
+    def __init__(self, results_dir="results", output_dir="reports", dpi=DEFAULT_PLOT_DPI, plot_format="png"):
+        """
+        初始化報告生成器
+        
+        參數:
+            results_dir: 實驗結果目錄
+            output_dir: 報告輸出目錄
+            dpi: 點陣圖表輸出解析度 (發佈用圖表可設為 300)
+            plot_format: 圖表格式 ("png" 或 "svg"，向量格式不需要逐像素光柵化)
+        """
         self.results_dir = Path(results_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.dpi = dpi
+        self.plot_format = plot_format
         
         # 初始化數據管理器
         self.data_manager = ExperimentDataManager(results_dir)
+        
+        # 重用的圖表 (按尺寸緩存)
+        self._figures = {}
     
     def set_output_dir(self, output_dir):
         """設置輸出目錄"""
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
+    def close(self):
+        """關閉重用的圖表，釋放內存"""
+        _close_figures(self._figures)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def generate_method_summary_plots(self, comparison_df=None):
         """
         生成方法比較的可視化圖表
@@ -52,74 +198,93 @@ class ReportGenerator:
             print("無法生成方法比較圖表: 沒有可用的數據")
             return []
         
-        plot_files = []
+        # 三張圖共用一個 Figure (一次創建和排版)，再按子圖範圍分別保存
+        plt = _pyplot()
+        fig = _reuse_figure(self._figures, (30, 8))
+        ax_snr = fig.add_subplot(1, 3, 1)
+        ax_compliance = fig.add_subplot(1, 3, 2)
+        ax_radar = fig.add_subplot(1, 3, 3, polar=True)
+        
+        # 每個方法已是一行匯總數據，直接繪製柱狀圖 (不需要 seaborn 的聚合和置信區間計算)
+        methods = comparison_df['method'].to_numpy()
         
         # 生成SNR改善柱狀圖
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='method', y='avg_snr_improvement', data=comparison_df)
-        plt.title('不同方法的平均信噪比改善')
-        plt.ylabel('信噪比改善 (dB)')
-        plt.xlabel('降噪方法')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        snr_plot_file = self.output_dir / 'methods_snr_comparison.png'
-        plt.savefig(snr_plot_file, dpi=300)
-        plt.close()
-        plot_files.append(snr_plot_file)
+        ax_snr.bar(methods, comparison_df['avg_snr_improvement'].to_numpy())
+        ax_snr.set_title('不同方法的平均信噪比改善')
+        ax_snr.set_ylabel('信噪比改善 (dB)')
+        ax_snr.set_xlabel('降噪方法')
+        ax_snr.tick_params(axis='x', labelrotation=45)
         
         # 生成合規率柱狀圖
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='method', y='compliance_rate', data=comparison_df)
-        plt.title('不同方法的符合標準率')
-        plt.ylabel('符合標準率')
-        plt.xlabel('降噪方法')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        compliance_plot_file = self.output_dir / 'methods_compliance_comparison.png'
-        plt.savefig(compliance_plot_file, dpi=300)
-        plt.close()
-        plot_files.append(compliance_plot_file)
+        ax_compliance.bar(methods, comparison_df['compliance_rate'].to_numpy())
+        ax_compliance.set_title('不同方法的符合標準率')
+        ax_compliance.set_ylabel('符合標準率')
+        ax_compliance.set_xlabel('降噪方法')
+        ax_compliance.tick_params(axis='x', labelrotation=45)
         
         # 生成多指標比較雷達圖
-        methods = comparison_df['method'].tolist()
         metrics = ['avg_snr_improvement', 'avg_cv_improvement', 
                   'avg_rms_improvement', 'compliance_rate']
         
         # 正規化數據用於雷達圖
-        radar_data = comparison_df[metrics].copy()
-        for col in radar_data.columns:
-            if radar_data[col].min() < 0:
-                # 對於可能有負值的列，使用不同的正規化方法
-                radar_data[col] = (radar_data[col] - radar_data[col].min()) / (radar_data[col].max() - radar_data[col].min())
-            else:
-                # 對於正值列，簡單除以最大值
-                radar_data[col] = radar_data[col] / radar_data[col].max()
-        
-        # 設置雷達圖參數
-        angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False).tolist()
-        angles += angles[:1]  # 閉合雷達圖
-        
-        fig, ax = plt.subplots(figsize=(10, 8), subplot_kw=dict(polar=True))
-        
-        for i, method in enumerate(methods):
-            values = radar_data.iloc[i].tolist()
-            values += values[:1]  # 閉合雷達圖
-            ax.plot(angles, values, linewidth=2, label=method)
-            ax.fill(angles, values, alpha=0.1)
+        # 有負值的列做最小-最大正規化，正值列簡單除以最大值 (所有列一次計算)
+        arr = comparison_df[metrics].to_numpy(dtype=np.float64)
+        mins = arr.min(axis=0)
+        maxs = arr.max(axis=0)
+        base = np.where(mins < 0, mins, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            radar_data = (arr - base) / (maxs - base)
+        
+        # 設置雷達圖參數 (角度和數值都附加第一列以閉合雷達圖)
+        angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False)
+        closed_angles = np.append(angles, angles[0])
+        closed_data = np.concatenate([radar_data, radar_data[:, :1]], axis=1)
+        
+        for method, values in zip(methods, closed_data):
+            ax_radar.plot(closed_angles, values, linewidth=2, label=method)
+            ax_radar.fill(closed_angles, values, alpha=0.1)
         
         # 設置標籤
-        ax.set_thetagrids(np.degrees(angles[:-1]), metrics)
-        ax.set_title('方法性能比較 (正規化數值)')
-        ax.grid(True)
-        plt.legend(loc='upper right')
-        plt.tight_layout()
-        
-        radar_plot_file = self.output_dir / 'methods_radar_comparison.png'
-        plt.savefig(radar_plot_file, dpi=300)
-        plt.close()
-        plot_files.append(radar_plot_file)
+        ax_radar.set_thetagrids(np.degrees(angles), metrics)
+        ax_radar.set_title('方法性能比較 (正規化數值)')
+        ax_radar.grid(True)
+        ax_radar.legend(loc='upper right')
+        
+        # 按各子圖的範圍 (含標題和刻度標籤) 分別保存，HTML報告仍引用三張獨立的圖
+        panels = [(ax, self.output_dir / f'{name}.{self.plot_format}')
+                  for ax, name in ((ax_snr, 'methods_snr_comparison'),
+                                   (ax_compliance, 'methods_compliance_comparison'),
+                                   (ax_radar, 'methods_radar_comparison'))]
+        
+        if self.plot_format == 'png':
+            # 在主線程渲染一次整張圖 (同時完成 constrained layout 排版)，再把各子圖的像素區域
+            # 交給線程池並行編碼 PNG (matplotlib 的繪圖狀態不是線程安全的，線程中只做編碼和寫入)
+            fig.set_dpi(self.dpi)
+            fig.canvas.draw()
+            renderer = fig.canvas.get_renderer()
+            pixels = np.asarray(fig.canvas.buffer_rgba())
+            height, width = pixels.shape[:2]
+            
+            crops = []
+            for ax, plot_file in panels:
+                box = ax.get_tightbbox(renderer).padded(0.1 * self.dpi)
+                x0, x1 = max(int(box.x0), 0), min(int(np.ceil(box.x1)), width)
+                y0, y1 = max(int(box.y0), 0), min(int(np.ceil(box.y1)), height)
+                crops.append((plot_file, pixels[height - y1:height - y0, x0:x1]))
+            
+            with ThreadPoolExecutor(max_workers=len(crops)) as pool:
+                for future in [pool.submit(plt.imsave, f, crop, dpi=self.dpi) for f, crop in crops]:
+                    future.result()
+        else:
+            # 向量格式按子圖範圍逐個保存 (先不渲染地完成排版，子圖範圍才準確)
+            fig.draw_without_rendering()
+            renderer = fig.canvas.get_renderer()
+            to_inches = fig.dpi_scale_trans.inverted()
+            for ax, plot_file in panels:
+                extent = ax.get_tightbbox(renderer).transformed(to_inches).padded(0.1)
+                fig.savefig(plot_file, dpi=self.dpi, bbox_inches=extent)
+        
+        plot_files = [plot_file for _, plot_file in panels]
         
         return plot_files
     
@@ -143,25 +308,30 @@ class ReportGenerator:
         
         # 重置列索引為單層
         stats_df = stats_summary.copy()
-        stats_df.columns = [f"{col[0]}_{col[1]}" for col in stats_df.columns]
+        stats_df.columns = stats_df.columns.to_flat_index().map('_'.join)
         stats_df = stats_df.reset_index()
         
-        # 創建Excel writer
+        import openpyxl
+        
+        # 創建只寫模式的工作簿 (逐行流式寫入，不為每個單元格建立對象)
         output_path = self.output_dir / filename
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            # 寫入方法比較摘要
-            method_comparison.to_excel(writer, sheet_name='方法比較', index=False)
-            
-            # 寫入詳細統計數據
-            stats_df.to_excel(writer, sheet_name='詳細統計', index=False)
-            
-            # 如果有時間線數據，也寫入
-            try:
-                timeline_df = self.data_manager.create_experiment_timeline()
-                if timeline_df is not None and not timeline_df.empty:
-                    timeline_df.to_excel(writer, sheet_name='實驗時間線', index=False)
-            except:
-                pass
+        wb = openpyxl.Workbook(write_only=True)
+        
+        # 寫入方法比較摘要
+        _append_sheet(wb, '方法比較', method_comparison)
+        
+        # 寫入詳細統計數據
+        _append_sheet(wb, '詳細統計', stats_df)
+        
+        # 如果有時間線數據，也寫入
+        try:
+            timeline_df = self.data_manager.create_experiment_timeline()
+            if timeline_df is not None and not timeline_df.empty:
+                _append_sheet(wb, '實驗時間線', timeline_df)
+        except:
+            pass
+        
+        wb.save(output_path)
         
         print(f"Excel摘要已保存至 {output_path}")
         return output_path
@@ -185,119 +355,27 @@ class ReportGenerator:
             print("無法生成HTML報告: 沒有足夠的數據")
             return None
         
-        # 獲取最佳方法
-        best_method = method_comparison.iloc[0]['method']
-        
-        # 創建HTML報告模板
-        template_str = """
-        <!DOCTYPE html>
-        <html lang="zh-TW">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>音頻降噪實驗報告</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 0; padding: 20px; color: #333; }
-                .container { max-width: 1200px; margin: 0 auto; }
-                header { text-align: center; margin-bottom: 30px; }
-                h1 { color: #2c3e50; }
-                h2 { color: #3498db; margin-top: 30px; }
-                .summary { background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px; }
-                .recommendation { background: #e8f4f8; padding: 15px; border-left: 5px solid #3498db; margin: 20px 0; }
-                table { width: 100%; border-collapse: collapse; margin: 20px 0; }
-                th, td { padding: 12px 15px; text-align: left; border-bottom: 1px solid #ddd; }
-                th { background-color: #f2f2f2; }
-                tr:hover { background-color: #f5f5f5; }
-                .plot-container { text-align: center; margin: 30px 0; }
-                .plot-container img { max-width: 100%; height: auto; border: 1px solid #ddd; border-radius: 4px; }
-                footer { margin-top: 50px; text-align: center; font-size: 0.9em; color: #7f8c8d; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <header>
-                    <h1>音頻降噪實驗報告</h1>
-                    <p>生成時間: {{ current_time }}</p>
-                </header>
-                
-                <section class="summary">
-                    <h2>實驗摘要</h2>
-                    <p>本報告匯總了多種音頻降噪方法的實驗結果。共測試了 {{ method_count }} 種降噪方法。</p>
-                    
-                    <div class="recommendation">
-                        <h3>推薦方法</h3>
-                        <p>根據實驗結果，<strong>{{ best_method }}</strong> 是效果最佳的降噪方法，平均SNR改善達 {{ best_snr_improvement }} dB。</p>
-                    </div>
-                </section>
-                
-                <section>
-                    <h2>方法比較</h2>
-                    <table>
-                        <tr>
-                            <th>方法</th>
-                            <th>SNR改善 (dB)</th>
-                            <th>CV改善 (%)</th>
-                            <th>RMS改善 (%)</th>
-                            <th>合規率</th>
-                        </tr>
-                        {% for _, row in method_comparison.iterrows() %}
-                        <tr>
-                            <td>{{ row.method }}</td>
-                            <td>{{ "%.2f"|format(row.avg_snr_improvement) }}</td>
-                            <td>{{ "%.2f"|format(row.avg_cv_improvement) }}</td>
-                            <td>{{ "%.2f"|format(row.avg_rms_improvement) }}</td>
-                            <td>{{ "%.1f%%"|format(row.compliance_rate*100) }}</td>
-                        </tr>
-                        {% endfor %}
-                    </table>
-                </section>
-                
-                <section>
-                    <h2>視覺化結果</h2>
-                    
-                    <div class="plot-container">
-                        <h3>SNR改善比較</h3>
-                        <img src="{{ plot_files[0].name }}" alt="SNR改善比較">
-                    </div>
-                    
-                    <div class="plot-container">
-                        <h3>合規率比較</h3>
-                        <img src="{{ plot_files[1].name }}" alt="合規率比較">
-                    </div>
-                    
-                    <div class="plot-container">
-                        <h3>多指標性能比較</h3>
-                        <img src="{{ plot_files[2].name }}" alt="多指標性能比較">
-                    </div>
-                </section>
-                
-                <footer>
-                    <p>© {{ current_year }} 音頻降噪實驗系統 | 報告自動生成</p>
-                </footer>
-            </div>
-        </body>
-        </html>
-        """
+        # 由 pandas 一次生成整個比較表格的HTML (按列指定格式)
+        table = method_comparison[list(_TABLE_COLUMNS)].rename(columns=_TABLE_COLUMNS)
+        table_html = table.to_html(index=False, border=0, classes='comparison',
+                                   formatters=_TABLE_FORMATTERS)
         
-        # 準備模板數據
+        # 準備模板數據 (最佳方法即排序後的第一行，生成時間只取一次)
+        best_row = method_comparison.iloc[0]
+        now = datetime.now()
         template_data = {
-            'current_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'current_year': datetime.now().year,
+            'current_time': now.strftime("%Y-%m-%d %H:%M:%S"),
+            'current_year': now.year,
             'method_count': len(method_comparison),
-            'best_method': best_method,
-            'best_snr_improvement': f"{method_comparison.iloc[0]['avg_snr_improvement']:.2f}",
-            'method_comparison': method_comparison,
-            'plot_files': [Path(f) for f in plot_files]
+            'best_method': best_row['method'],
+            'best_snr_improvement': f"{best_row['avg_snr_improvement']:.2f}",
+            'table_html': table_html,
+            'plot_files': [f.name for f in plot_files]
         }
         
-        # 渲染模板
-        template = jinja2.Template(template_str)
-        html_content = template.render(**template_data)
-        
-        # 寫入HTML文件
+        # 渲染模板並逐塊寫入HTML文件 (模板只在首次使用時編譯，不在內存中拼接整個文檔)
         output_path = self.output_dir / filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        _get_html_template().stream(**template_data).dump(str(output_path), encoding='utf-8')
         
         print(f"HTML報告已保存至 {output_path}")
         return output_path
@@ -311,6 +389,7 @@ class ReportGenerator:
         """
         if report_path is None:
             report_path = self.output_dir / "experiment_report.html"
+        report_path = Path(report_path).absolute()
         
         if not report_path.exists():
             print(f"報告文件 {report_path} 不存在")
@@ -318,7 +397,8 @@ class ReportGenerator:
         
         # 嘗試在瀏覽器中打開
         try:
-            webbrowser.open(f"file://{report_path.absolute()}")
+            import webbrowser
+            webbrowser.open(report_path.as_uri())
             return True
         except Exception as e:
             print(f"無法在瀏覽器中打開報告: {str(e)}")
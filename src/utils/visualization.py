@@ -7,26 +7,202 @@
 """
 
 import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-import librosa
-import librosa.display
-import seaborn as sns
 from pathlib import Path
+from collections import OrderedDict
+
+# 圖表輸出的預設解析度 (命令行 --plot_dpi 和各繪圖類共用，發佈用圖表可設為 300)
+DEFAULT_PLOT_DPI = 120
+
+def _pyplot():
+    """
+    延遲導入 matplotlib.pyplot (只在繪圖時需要，導入本模塊時不載入)
+    
+    pyplot 尚未被導入時使用非交互式的 Agg 後端，跳過 GUI 後端探測。
+    
+    返回值:
+        plt: matplotlib.pyplot 模塊
+    """
+    if 'matplotlib.pyplot' not in sys.modules:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+# 每個可視化器緩存的最近頻譜 (dB) 數量，同一段音頻繪製多張頻譜圖時只做一次 STFT
+_STFT_CACHE_SIZE = 4
+
+def _stft_db(audio_data, cache):
+    """
+    計算音頻的對數幅度頻譜 (dB)，按數組對象緩存最近的結果
+    
+    緩存中保留數組本身的引用，因此數組存活期間鍵不會被其他數組重用；
+    繪圖期間不應原地修改音頻數組。緩存屬於可視化器實例，在 close() 時清空。
+    
+    參數:
+        audio_data: 音頻數據
+        cache: 頻譜緩存 (OrderedDict)
+        
+    返回值:
+        D: 頻譜 (dB，相對最大值)
+    """
+    key = (id(audio_data), audio_data.shape, audio_data.dtype.str)
+    entry = cache.get(key)
+    if entry is not None and entry[0] is audio_data:
+        cache.move_to_end(key)
+        return entry[1]
+    
+    import librosa
+    
+    # 單精度 STFT (complex64)，頻譜圖只用於顯示，精度足夠且內存帶寬減半
+    S = np.abs(librosa.stft(audio_data.astype(np.float32, copy=False), dtype=np.complex64))
+    D = librosa.amplitude_to_db(S, ref=np.max)
+    
+    cache[key] = (audio_data, D)
+    if len(cache) > _STFT_CACHE_SIZE:
+        cache.popitem(last=False)
+    return D
+
+def _envelope(audio_data, n_out=4000):
+    """
+    把音頻抽取為最多 n_out 個區塊的最小/最大值包絡
+    
+    參數:
+        audio_data: 音頻數據
+        n_out: 最大輸出點數
+        
+    返回值:
+        starts: 每個區塊的起始樣本位置
+        mins: 每個區塊的最小值
+        maxs: 每個區塊的最大值
+    """
+    x = np.asarray(audio_data)
+    block = max(1, -(-len(x) // n_out))
+    n_blocks = -(-len(x) // block)
+    
+    # 以最後一個樣本補齊到區塊長度的整數倍，不影響最小/最大值
+    pad = n_blocks * block - len(x)
+    if pad:
+        x = np.pad(x, (0, pad), mode='edge')
+    
+    frames = x.reshape(n_blocks, block)
+    return np.arange(n_blocks) * block, frames.min(axis=1), frames.max(axis=1)
+
+def _plot_envelope(ax, audio_data, sr, n_out=4000):
+    """
+    繪製音頻波形的包絡 (點數與圖表寬度相當，而不是與樣本數成正比)
+    
+    參數:
+        ax: 目標坐標軸
+        audio_data: 音頻數據
+        sr: 採樣率
+        n_out: 最大繪製點數
+    """
+    if len(audio_data) == 0:
+        return
+    if len(audio_data) <= n_out:
+        # 短片段直接繪製波形 (每個區塊只有一個樣本時包絡的高度為零)
+        ax.plot(np.arange(len(audio_data)) / sr, audio_data)
+    else:
+        # 描邊使平坦區段 (最小值等於最大值) 的包絡仍然可見
+        starts, mins, maxs = _envelope(audio_data, n_out)
+        ax.fill_between(starts / sr, mins, maxs, lw=0.5, edgecolor='face')
+    ax.set_xlim(0, len(audio_data) / sr)
+
+# 逐文件柱狀圖的最大柱數，以及散點圖改為密度圖的點數閾值
+_MAX_BARS = 200
+_MAX_SCATTER_POINTS = 10000
+
+def _plot_per_file(ax, values):
+    """
+    繪製每個文件的指標值 (文件數較多時以階梯填充代替逐個柱子)
+    
+    參數:
+        ax: 目標坐標軸
+        values: 每個文件的指標值
+    """
+    y = np.asarray(values, dtype=np.float64)
+    x = np.arange(len(y))
+    if len(y) > _MAX_BARS:
+        ax.fill_between(x, 0, y, step='mid', lw=0)
+    else:
+        ax.bar(x, y)
+
+def _reuse_figure(figures, figsize):
+    """
+    取得指定尺寸的圖表並設為當前圖表 (已存在時清空後重用，避免每張圖重新創建 Figure)
+    
+    圖表使用 constrained layout，排版在繪製時完成，不需要再調用 tight_layout。
+    
+    參數:
+        figures: 以尺寸為鍵的圖表緩存字典
+        figsize: 圖表尺寸 (寬, 高)
+        
+    返回值:
+        fig: 清空後的 matplotlib Figure
+    """
+    plt = _pyplot()
+    fig = figures.get(figsize)
+    if fig is not None and plt.fignum_exists(fig.number):
+        plt.figure(fig.number)
+        fig.clf()
+    else:
+        fig = plt.figure(figsize=figsize, layout='constrained')
+        figures[figsize] = fig
+    return fig
+
+def _close_figures(figures):
+    """
+    關閉並清空緩存的圖表
+    
+    參數:
+        figures: 以尺寸為鍵的圖表緩存字典
+    """
+    if not figures:
+        return
+    plt = _pyplot()
+    for fig in figures.values():
+        plt.close(fig)
+    figures.clear()
 
 class AudioVisualizer:
     """音頻可視化器"""
     
-    def __init__(self, output_dir="visualizations"):
-        """初始化可視化器"""
+    def __init__(self, output_dir="visualizations", dpi=DEFAULT_PLOT_DPI):
+        """
+        初始化可視化器
+        
+        參數:
+            output_dir: 輸出目錄
+            dpi: 圖表輸出解析度 (發佈用圖表可設為 300)
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.dpi = dpi
+        
+        # 重用的圖表 (按尺寸緩存)
+        self._figures = {}
+        
+        # 最近計算過的頻譜 {(數組id, 形狀, 類型): (音頻數組, 頻譜)}，按最近使用排序
+        self._stft_cache = OrderedDict()
     
     def set_output_dir(self, output_dir):
         """設置輸出目錄"""
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
+    def close(self):
+        """關閉重用的圖表並清空頻譜緩存，釋放內存"""
+        _close_figures(self._figures)
+        self._stft_cache.clear()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def plot_waveform(self, audio_data, sr, title="音頻波形", filename=None):
         """
         繪製音頻波形圖
@@ -37,19 +213,17 @@ class AudioVisualizer:
             title: 標題
             filename: 輸出文件名
         """
-        plt.figure(figsize=(10, 4))
-        librosa.display.waveshow(audio_data, sr=sr)
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 4))
+        _plot_envelope(plt.gca(), audio_data, sr)
         plt.title(title)
         plt.xlabel("時間 (秒)")
         plt.ylabel("振幅")
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
     
-    def plot_spectrogram(self, audio_data, sr, title="頻譜圖", filename=None):
+    def plot_spectrogram(self, audio_data, sr, title="頻譜圖", filename=None, D=None):
         """
         繪製頻譜圖
         
@@ -58,22 +232,23 @@ class AudioVisualizer:
             sr: 採樣率
             title: 標題
             filename: 輸出文件名
+            D: 預先計算的頻譜 (dB，可選)
         """
-        plt.figure(figsize=(10, 6))
+        import librosa.display
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 6))
         
-        # 計算短時傅立葉變換
-        D = librosa.amplitude_to_db(abs(librosa.stft(audio_data)), ref=np.max)
+        # 計算短時傅立葉變換 (已有頻譜時直接使用)
+        if D is None:
+            D = _stft_db(audio_data, self._stft_cache)
         
         # 繪製頻譜圖
         librosa.display.specshow(D, sr=sr, x_axis='time', y_axis='log')
         plt.colorbar(format='%+2.0f dB')
         plt.title(title)
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
     
     def plot_audio_comparison(self, original_audio, processed_audio, sr, title="音頻對比", filename=None):
         """
@@ -86,31 +261,30 @@ class AudioVisualizer:
             title: 標題
             filename: 輸出文件名
         """
-        plt.figure(figsize=(10, 8))
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 8))
         
         # 繪製原始波形
         plt.subplot(2, 1, 1)
-        librosa.display.waveshow(original_audio, sr=sr)
+        _plot_envelope(plt.gca(), original_audio, sr)
         plt.title("原始音頻")
         plt.xlabel("時間 (秒)")
         plt.ylabel("振幅")
         
         # 繪製處理後波形
         plt.subplot(2, 1, 2)
-        librosa.display.waveshow(processed_audio, sr=sr)
+        _plot_envelope(plt.gca(), processed_audio, sr)
         plt.title("處理後音頻")
         plt.xlabel("時間 (秒)")
         plt.ylabel("振幅")
         
         plt.suptitle(title)
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
     
-    def plot_spectrum_comparison(self, original_audio, processed_audio, sr, title="頻譜對比", filename=None):
+    def plot_spectrum_comparison(self, original_audio, processed_audio, sr, title="頻譜對比", filename=None,
+                                 D_original=None, D_processed=None):
         """
         繪製原始音頻和處理後音頻的頻譜對比圖
         
@@ -120,14 +294,20 @@ class AudioVisualizer:
             sr: 採樣率
             title: 標題
             filename: 輸出文件名
+            D_original: 預先計算的原始音頻頻譜 (dB，可選)
+            D_processed: 預先計算的處理後音頻頻譜 (dB，可選)
         """
-        plt.figure(figsize=(10, 8))
+        import librosa.display
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 8))
         
         # 計算原始音頻的短時傅立葉變換
-        D_original = librosa.amplitude_to_db(abs(librosa.stft(original_audio)), ref=np.max)
+        if D_original is None:
+            D_original = _stft_db(original_audio, self._stft_cache)
         
         # 計算處理後音頻的短時傅立葉變換
-        D_processed = librosa.amplitude_to_db(abs(librosa.stft(processed_audio)), ref=np.max)
+        if D_processed is None:
+            D_processed = _stft_db(processed_audio, self._stft_cache)
         
         # 繪製原始頻譜圖
         plt.subplot(2, 1, 1)
@@ -142,26 +322,43 @@ class AudioVisualizer:
         plt.title("處理後音頻頻譜")
         
         plt.suptitle(title)
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
 
 class ExperimentVisualizer:
     """實驗可視化器"""
     
-    def __init__(self, output_dir="experiment_results"):
-        """初始化可視化器"""
+    def __init__(self, output_dir="experiment_results", dpi=DEFAULT_PLOT_DPI):
+        """
+        初始化可視化器
+        
+        參數:
+            output_dir: 輸出目錄
+            dpi: 圖表輸出解析度 (發佈用圖表可設為 300)
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.dpi = dpi
+        
+        # 重用的圖表 (按尺寸緩存)
+        self._figures = {}
     
     def set_output_dir(self, output_dir):
         """設置輸出目錄"""
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
+    def close(self):
+        """關閉重用的圖表，釋放內存"""
+        _close_figures(self._figures)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def plot_metrics_improvement(self, results_df, metric, title=None, filename=None):
         """
         繪製指標改善圖
@@ -175,20 +372,18 @@ class ExperimentVisualizer:
         if not title:
             title = f"{metric} 改善圖"
         
-        plt.figure(figsize=(10, 6))
-        plt.bar(range(len(results_df)), results_df[f'{metric}_improvement'])
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 6))
+        _plot_per_file(plt.gca(), results_df[f'{metric}_improvement'])
         plt.axhline(y=0, color='r', linestyle='-')
         plt.title(title)
         plt.ylabel(f"{metric} 改善")
         plt.xlabel("音頻文件")
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
         else:
-            plt.savefig(self.output_dir / f"{metric}_improvement.png", dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / f"{metric}_improvement.png", dpi=self.dpi)
     
     def plot_method_comparison(self, comparison_df, metric, title=None, filename=None):
         """
@@ -203,20 +398,18 @@ class ExperimentVisualizer:
         if not title:
             title = f"不同方法的 {metric} 比較"
         
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='method', y=f'avg_{metric}_improvement', data=comparison_df)
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 6))
+        plt.bar(comparison_df['method'].to_numpy(), comparison_df[f'avg_{metric}_improvement'].to_numpy())
         plt.title(title)
         plt.ylabel(f"{metric} 改善")
         plt.xlabel("降噪方法")
         plt.xticks(rotation=45)
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
         else:
-            plt.savefig(self.output_dir / f"methods_{metric}_comparison.png", dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / f"methods_{metric}_comparison.png", dpi=self.dpi)
     
     def plot_compliance_comparison(self, comparison_df, title=None, filename=None):
         """
@@ -230,20 +423,18 @@ class ExperimentVisualizer:
         if not title:
             title = "不同方法的符合標準率"
         
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='method', y='compliance_rate', data=comparison_df)
+        plt = _pyplot()
+        _reuse_figure(self._figures, (10, 6))
+        plt.bar(comparison_df['method'].to_numpy(), comparison_df['compliance_rate'].to_numpy())
         plt.title(title)
         plt.ylabel("符合標準率")
         plt.xlabel("降噪方法")
         plt.xticks(rotation=45)
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
         else:
-            plt.savefig(self.output_dir / "methods_compliance_comparison.png", dpi=300)
-        
-        plt.close()
+            plt.savefig(self.output_dir / "methods_compliance_comparison.png", dpi=self.dpi)
     
     def create_summary_report(self, results_df, method, title=None, filename=None):
         """
@@ -258,25 +449,32 @@ class ExperimentVisualizer:
         if not title:
             title = f"{method} 方法降噪效果摘要"
         
-        plt.figure(figsize=(12, 10))
+        plt = _pyplot()
+        _reuse_figure(self._figures, (12, 10))
         
         # 信噪比改善
         plt.subplot(2, 2, 1)
-        plt.bar(range(len(results_df)), results_df['snr_improvement'])
+        _plot_per_file(plt.gca(), results_df['snr_improvement'])
         plt.axhline(y=0, color='r', linestyle='-')
         plt.title("信噪比改善")
         plt.ylabel("SNR 改善 (dB)")
         
         # 變異係數改善
         plt.subplot(2, 2, 2)
-        plt.bar(range(len(results_df)), results_df['cv_improvement'])
+        _plot_per_file(plt.gca(), results_df['cv_improvement'])
         plt.axhline(y=0, color='r', linestyle='-')
         plt.title("變異係數改善")
         plt.ylabel("CV 改善 (%)")
         
         # 原始vs處理後 SNR
         plt.subplot(2, 2, 3)
-        plt.scatter(results_df['original_snr'], results_df['processed_snr'])
+        original_snr = results_df['original_snr'].to_numpy(dtype=np.float64)
+        processed_snr = results_df['processed_snr'].to_numpy(dtype=np.float64)
+        if len(original_snr) > _MAX_SCATTER_POINTS:
+            # 點數過多時改用六邊形分箱密度圖
+            plt.hexbin(original_snr, processed_snr, gridsize=50, mincnt=1, cmap='Blues')
+        else:
+            plt.scatter(original_snr, processed_snr)
         plt.plot([0, 40], [0, 40], 'r--')  # 對角線
         plt.title("原始 vs. 處理後 SNR")
         plt.xlabel("原始 SNR (dB)")
@@ -296,11 +494,8 @@ class ExperimentVisualizer:
         plt.ylim(0, 100)
         
         plt.suptitle(title)
-        plt.tight_layout()
         
         if filename:
-            plt.savefig(self.output_dir / filename, dpi=300)
+            plt.savefig(self.output_dir / filename, dpi=self.dpi)
         else:
-            plt.savefig(self.output_dir / f"{method}_summary_report.png", dpi=300)
-        
-        plt.close()
\ No newline at end of file
+            plt.savefig(self.output_dir / f"{method}_summary_report.png", dpi=self.dpi)